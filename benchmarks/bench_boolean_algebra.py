@@ -0,0 +1,64 @@
+"""
+Benchmark string filter rule evaluation.
+
+Compares substituting symbols and simplifying (evaluate_expression) against the compiled predicate
+(compile_expression) on a set of typical filter rules and listing titles.
+"""
+
+import random
+import timeit
+from typing import Callable
+
+from hyacinth.util.boolean_algebra import compile_expression, evaluate_expression, parse_expression
+
+RULES = [
+    "bike",
+    "road bike or gravel bike or cyclocross",
+    "(trek or specialized or cannondale) and not (kids or parts)",
+    "honda and (cbr or rebel or grom) and not salvage and not (project or parts only)",
+]
+WORDS = [
+    "trek",
+    "specialized",
+    "road",
+    "bike",
+    "gravel",
+    "kids",
+    "parts",
+    "honda",
+    "rebel",
+    "salvage",
+    "excellent",
+    "condition",
+    "used",
+    "new",
+]
+NUM_TEXTS = 200
+
+
+def _time(fn: Callable[[], object], number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def main() -> None:
+    rng = random.Random(0)
+    texts = [" ".join(rng.choices(WORDS, k=12)) for _ in range(NUM_TEXTS)]
+
+    print(f"{'rule':<50} {'simplify (us)':>14} {'compiled (us)':>14} {'speedup':>8}")
+    for rule in RULES:
+        expression = parse_expression(rule)
+        predicate = compile_expression(expression)
+
+        simplify_time = _time(lambda: [evaluate_expression(expression, t) for t in texts], 5)
+        compiled_time = _time(lambda: [predicate(t) for t in texts], 200)
+
+        simplify_us = simplify_time / NUM_TEXTS * 1e6
+        compiled_us = compiled_time / NUM_TEXTS * 1e6
+        print(
+            f"{rule[:50]:<50} {simplify_us:>14.2f} {compiled_us:>14.2f}"
+            f" {simplify_us / compiled_us:>7.0f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Benchmark the filter engine on synthetic listings.
+
+Generates Craigslist and Marketplace style listings and typical filter sets (keyword AND/OR rules on
+the title and body, numeric price bounds, and a mix of both), then reports listings/second and the
+cost per filter of filters.test, with and without cached results, along with the cost of
+evaluate_expression and parse_expression for each rule.
+
+Timings are also given relative to a fixed pure Python workload, which makes them roughly
+comparable between machines. Run with --save-baseline to record them in
+baselines/bench_filters.json, and with --compare to check them against the recorded baseline. The
+comparison exits with an error if any benchmark is more than --tolerance slower than the baseline.
+"""
+
+import argparse
+import json
+import random
+import sys
+import timeit
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable
+
+from boolean import Expression
+
+from hyacinth import filters
+from hyacinth.db.models import Filter
+from hyacinth.enums import RuleType
+from hyacinth.util.boolean_algebra import evaluate_expression, parse_expression
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "bench_filters.json"
+DEFAULT_TOLERANCE = 0.5
+NUM_LISTINGS = 500
+ROUNDS = 3
+
+BRANDS = ["trek", "specialized", "cannondale", "giant", "honda", "yamaha", "ikea", "herman miller"]
+ITEMS = ["road bike", "gravel bike", "mountain bike", "scooter", "motorcycle", "desk", "chair"]
+DESCRIPTORS = ["excellent condition", "like new", "used", "for parts", "kids", "salvage", "vintage"]
+FILLER = ["pickup only", "cash", "no trades", "serious inquiries", "price firm", "must go", "obo"]
+CITIES = [("Boston", "MA"), ("Cambridge", "MA"), ("Providence", "RI"), ("Portland", "ME")]
+
+FILTER_SETS: dict[str, list[tuple[str, RuleType, str]]] = {
+    "keywords": [
+        ("title", RuleType.AND, "(trek or specialized or cannondale) and not (kids or for parts)"),
+        ("body", RuleType.AND, "not salvage"),
+        ("title", RuleType.OR, "road bike or gravel bike"),
+        ("body", RuleType.OR, "excellent condition or like new"),
+    ],
+    "price": [
+        ("price", RuleType.AND, ">= 100"),
+        ("price", RuleType.AND, "<= 1500"),
+    ],
+    "mixed": [
+        ("title", RuleType.AND, "honda and (rebel or grom or cbr) and not salvage"),
+        ("body", RuleType.AND, "not (for parts or project)"),
+        ("price", RuleType.AND, "> 500"),
+        ("price", RuleType.AND, "< 5000"),
+        ("title", RuleType.OR, "motorcycle"),
+        ("body", RuleType.OR, "vintage or like new"),
+    ],
+}
+
+
+def make_listing(rng: random.Random, index: int) -> dict[str, Any]:
+    """
+    Make a listing with the fields shared by Craigslist and Marketplace listings.
+    """
+    city, state = rng.choice(CITIES)
+    title = f"{rng.choice(BRANDS)} {rng.choice(ITEMS)} - {rng.choice(DESCRIPTORS)}"
+    body = ". ".join(
+        " ".join(rng.choices(BRANDS + ITEMS + DESCRIPTORS + FILLER, k=rng.randint(4, 10)))
+        for _ in range(rng.randint(2, 8))
+    )
+    return {
+        "creation_time": (datetime(2024, 1, 1) + timedelta(minutes=index)).isoformat(),
+        "title": title.title(),
+        "url": f"https://example.com/listing/{index}",
+        "body": body.capitalize(),
+        "image_urls": [f"https://example.com/images/{index}/{i}.jpg" for i in range(3)],
+        "thumbnail_url": f"https://example.com/images/{index}/0.jpg",
+        "price": round(rng.lognormvariate(6, 1.2), 2),
+        "city": city,
+        "state": state,
+        "latitude": 42.36 + rng.uniform(-1, 1),
+        "longitude": -71.06 + rng.uniform(-1, 1),
+    }
+
+
+def _time(fn: Callable[[], object], number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def _calibrate() -> float:
+    return _time(lambda: sorted(str(i) for i in range(10000)), 10)
+
+
+def _can_evaluate(expression: Expression, texts: list[str]) -> bool:
+    # simplify() cannot always reduce negated expressions to a boolean
+    try:
+        for text in texts:
+            evaluate_expression(expression, text)
+    except TypeError:
+        return False
+    return True
+
+
+def run() -> dict[str, float]:
+    """
+    Run every benchmark, returning the seconds taken per operation by name.
+    """
+    rng = random.Random(0)
+    listings = [make_listing(rng, i) for i in range(NUM_LISTINGS)]
+    results: dict[str, float] = {}
+
+    for name, rules in FILTER_SETS.items():
+        compiled = filters.compile_filters(
+            Filter(field=field, rule_type=rule_type, rule_expr=rule_expr)
+            for field, rule_type, rule_expr in rules
+        )
+
+        def test_uncached() -> None:
+            for listing in listings:
+                filters.test(listing, compiled)
+
+        def test_cached() -> None:
+            for content_id, listing in enumerate(listings):
+                filters.test(listing, compiled, cache_key=(content_id, 1))
+
+        results[f"filters.test/{name}"] = _time(test_uncached, 5) / NUM_LISTINGS
+        test_cached()  # populate the result caches
+        results[f"filters.test/{name}/cached"] = _time(test_cached, 20) / NUM_LISTINGS
+
+    keyword_rules = {
+        (field, rule_expr)
+        for rules in FILTER_SETS.values()
+        for field, _, rule_expr in rules
+        if field != "price"
+    }
+    for field, rule_expr in sorted(keyword_rules):
+        expression = parse_expression(rule_expr)
+        texts = [listing[field].lower() for listing in listings[:50]]
+
+        if _can_evaluate(expression, texts):
+            results[f"evaluate_expression/{rule_expr}"] = _time(
+                lambda: [evaluate_expression(expression, text) for text in texts], 3
+            ) / len(texts)
+        results[f"parse_expression/{rule_expr}"] = _time(
+            lambda: parse_expression.__wrapped__(rule_expr), 100
+        )
+
+    return results
+
+
+def _print_results(results: dict[str, float], calibration: float) -> None:
+    print(f"{'benchmark':<80} {'us/op':>10} {'ops/s':>10} {'us/filter':>10} {'relative':>9}")
+    for name, seconds in results.items():
+        filter_set = name.split("/")[1] if name.startswith("filters.test/") else None
+        per_filter = (
+            f"{seconds / len(FILTER_SETS[filter_set]) * 1e6:>10.2f}" if filter_set else f"{'':>10}"
+        )
+        print(
+            f"{name[:80]:<80} {seconds * 1e6:>10.2f} {1 / seconds:>10.0f} {per_filter}"
+            f" {seconds / calibration:>9.5f}"
+        )
+    print("(for filters.test, an op is one listing)")
+
+
+def _compare(results: dict[str, float], calibration: float, tolerance: float) -> bool:
+    """
+    Compare relative timings with the baseline, returning whether there were no regressions.
+    """
+    baseline = json.loads(BASELINE_PATH.read_text())
+    ok = True
+    print(f"\n{'benchmark':<80} {'baseline':>9} {'current':>9} {'change':>8}")
+    for name, seconds in results.items():
+        if name not in baseline["relative"]:
+            print(f"{name[:80]:<80} {'-':>9} {seconds / calibration:>9.5f} {'new':>8}")
+            continue
+
+        expected = baseline["relative"][name]
+        actual = seconds / calibration
+        change = actual / expected - 1
+        regressed = change > tolerance
+        ok = ok and not regressed
+        print(
+            f"{name[:80]:<80} {expected:>9.5f} {actual:>9.5f} {change:>+8.0%}"
+            + ("  REGRESSION" if regressed else "")
+        )
+    return ok
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--save-baseline", action="store_true", help="record results as baseline")
+    parser.add_argument("--compare", action="store_true", help="compare results with baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    args = parser.parse_args()
+
+    # the fastest of several rounds is the least affected by other activity on the machine
+    calibration = min(_calibrate() for _ in range(ROUNDS))
+    rounds = [run() for _ in range(ROUNDS)]
+    results = {name: min(round_[name] for round_ in rounds) for name in rounds[0]}
+    _print_results(results, calibration)
+
+    if args.save_baseline:
+        BASELINE_PATH.parent.mkdir(exist_ok=True)
+        relative = {name: round(seconds / calibration, 6) for name, seconds in results.items()}
+        BASELINE_PATH.write_text(json.dumps({"relative": relative}, indent=2) + "\n")
+        print(f"\nSaved baseline to {BASELINE_PATH}")
+    elif args.compare and not _compare(results, calibration, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""
+Benchmark finding filter keywords in listing text.
+
+Compares checking for each keyword separately against a single KeywordMatcher pass, for different
+numbers of keywords and lengths of text.
+"""
+
+import random
+import timeit
+from typing import Callable
+
+from hyacinth.util.keyword_matcher import KeywordMatcher
+
+KEYWORD_COUNTS = [5, 20, 60, 150]
+TEXT_LENGTHS = [80, 2000]  # roughly a title and a description
+
+
+def _time(fn: Callable[[], object], number: int = 500) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def _random_word(rng: random.Random) -> str:
+    return "".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(3, 9)))
+
+
+def main() -> None:
+    rng = random.Random(0)
+    vocabulary = [_random_word(rng) for _ in range(3000)]
+
+    print(f"{'keywords':>8} {'text length':>11} {'per keyword (us)':>17} {'matcher (us)':>13}")
+    for keyword_count in KEYWORD_COUNTS:
+        keywords = rng.sample(vocabulary, keyword_count)
+        matcher = KeywordMatcher(keywords)
+        for text_length in TEXT_LENGTHS:
+            words: list[str] = []
+            while sum(len(word) + 1 for word in words) < text_length:
+                words.append(rng.choice(vocabulary))
+            text = " ".join(words)
+
+            per_keyword_time = _time(lambda: {keyword for keyword in keywords if keyword in text})
+            matcher_time = _time(lambda: matcher.match(text))
+            print(
+                f"{keyword_count:>8} {text_length:>11} {per_keyword_time * 1e6:>17.2f}"
+                f" {matcher_time * 1e6:>13.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
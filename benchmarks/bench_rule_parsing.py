@@ -0,0 +1,117 @@
+"""
+Benchmark parsing string filter rules.
+
+Compares the original tokenizer, which scanned one character at a time and then merged multi-word
+symbols by repeatedly popping and inserting tokens, against the single-pass tokenizer on rule
+expressions of increasing length, and shows the cost of parsing a rule with and without the parsed
+expression cache.
+"""
+
+import random
+import timeit
+from typing import Any, Callable
+
+from boolean import TOKEN_SYMBOL, ParseError, boolean
+
+from hyacinth.util.boolean_algebra import _TOKENS, algebra, parse_expression
+
+WORDS = ["trek", "specialized", "road", "bike", "gravel", "kids", "parts", "honda", "rebel"]
+NUM_CLAUSES = [1, 10, 100, 1000]
+
+
+def _tokenize_original(expr: str) -> list[tuple[Any, str, int]]:
+    """
+    The original tokenizer, which the single-pass tokenizer replaced.
+    """
+    tokens: list[tuple[Any, str, int]] = []
+    position = 0
+    length = len(expr)
+    while position < length:
+        tok = expr[position]
+
+        sym = tok.isalnum() or tok == "_"
+        if sym:
+            position += 1
+            while position < length:
+                char = expr[position]
+                if char.isalnum() or char in algebra.allowed_in_token:
+                    position += 1
+                    tok += char
+                else:
+                    break
+            position -= 1
+
+        try:
+            tokens.append((_TOKENS[tok.lower()], tok, position))
+        except KeyError as e:
+            if sym:
+                tokens.append((TOKEN_SYMBOL, tok, position))
+            elif tok not in (" ", "\t", "\r", "\n"):
+                raise ParseError(
+                    token_string=tok, position=position, error_code=boolean.PARSE_UNKNOWN_TOKEN
+                ) from e
+
+        position += 1
+
+    i = len(tokens) - 1
+    while i > 0:
+        if tokens[i][1] in _TOKENS:
+            i -= 1
+            continue
+
+        pos = tokens[i][2]
+        new_token = ""
+        j = i - 1
+        while j >= 0 and tokens[j][1] not in _TOKENS:
+            new_token = tokens[j + 1][1] + " " + new_token
+            tokens.pop(j + 1)
+            j -= 1
+        new_token = (tokens[j + 1][1] + " " + new_token)[:-1]
+        tokens.pop(j + 1)
+
+        tokens.insert(j + 1, (TOKEN_SYMBOL, new_token, pos))
+        i -= i - j
+
+    return tokens
+
+
+def _make_rule(rng: random.Random, num_clauses: int) -> str:
+    clauses = [" ".join(rng.choices(WORDS, k=rng.randint(1, 4))) for _ in range(num_clauses)]
+    return " or ".join(f"({clause} and not kids)" for clause in clauses)
+
+
+def _time(fn: Callable[[], object], number: int) -> float:
+    return min(timeit.repeat(fn, number=number, repeat=5)) / number
+
+
+def main() -> None:
+    rng = random.Random(0)
+
+    print(
+        f"{'clauses':>8} {'tokens':>8} {'original (us)':>14} {'single-pass (us)':>17} {'speedup':>8}"
+    )
+    for num_clauses in NUM_CLAUSES:
+        rule = _make_rule(rng, num_clauses)
+        assert _tokenize_original(rule) == algebra.tokenize(rule)
+
+        number = max(1, 1000 // num_clauses)
+        original_us = _time(lambda: _tokenize_original(rule), number) * 1e6
+        single_pass_us = _time(lambda: algebra.tokenize(rule), number) * 1e6
+        print(
+            f"{num_clauses:>8} {len(algebra.tokenize(rule)):>8} {original_us:>14.1f}"
+            f" {single_pass_us:>17.1f} {original_us / single_pass_us:>7.1f}x"
+        )
+
+    print()
+    print(f"{'clauses':>8} {'uncached parse (us)':>20} {'cached parse (us)':>18}")
+    for num_clauses in NUM_CLAUSES[:-1]:
+        rule = _make_rule(rng, num_clauses)
+
+        number = max(1, 100 // num_clauses)
+        uncached_us = _time(lambda: parse_expression.__wrapped__(rule), number) * 1e6
+        cached_us = _time(lambda: parse_expression(rule), 1000) * 1e6
+        print(f"{num_clauses:>8} {uncached_us:>20.1f} {cached_us:>18.2f}")
+
+
+if __name__ == "__main__":
+    main()
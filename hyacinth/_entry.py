@@ -2,6 +2,7 @@ import asyncio
 
 from hyacinth.discord import discord_bot
 from hyacinth.metrics import flush_buffer as flush_metrics_buffer
+from hyacinth.state_store import get_state_store
 
 
 def run_discord_bot() -> None:
@@ -10,4 +11,5 @@ def run_discord_bot() -> None:
     except KeyboardInterrupt:
         pass
     finally:
+        get_state_store().flush()
         flush_metrics_buffer()
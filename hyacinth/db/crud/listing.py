@@ -1,10 +1,39 @@
 from datetime import datetime
-from typing import Sequence
+from typing import Iterable, Iterator, Mapping, Sequence
 
-from sqlalchemy import select
-from sqlalchemy.orm import Session
+from sqlalchemy import (
+    ColumnElement,
+    Select,
+    and_,
+    delete,
+    exists,
+    func,
+    literal,
+    or_,
+    select,
+    true,
+    tuple_,
+    union_all,
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session, aliased, contains_eager
+from sqlalchemy.orm.attributes import set_committed_value
 
-from hyacinth.db.models import Listing
+from hyacinth.db.expressions import json_field_float, json_field_text
+from hyacinth.db.models import Listing, ListingContent, NotifierSearch
+from hyacinth.models import BaseListing
+
+
+# listings are inserted in batches of at most this many rows, to stay well within the limit on the
+# number of bind parameters in a single statement (32767 for Postgres)
+_INSERT_BATCH_SIZE = 1000
+
+
+def _select_listings_with_content() -> Select[tuple[Listing]]:
+    """
+    Select listings joined with their content, for queries with conditions on the listing JSON.
+    """
+    return select(Listing).join(Listing.content).options(contains_eager(Listing.content))
 
 
 def get_listings(session: Session, search_spec_id: int, after_time: datetime) -> Sequence[Listing]:
@@ -18,6 +47,186 @@ def get_listings(session: Session, search_spec_id: int, after_time: datetime) ->
     return session.execute(stmt).scalars().all()
 
 
+def iter_listings(
+    session: Session, search_spec_id: int, after_time: datetime, batch_size: int
+) -> Iterator[Sequence[Listing]]:
+    """
+    Like get_listings, but stream the listings in batches instead of loading them all at once.
+    """
+    stmt = (
+        select(Listing)
+        .where(Listing.creation_time > after_time)
+        .where(Listing.search_spec_id == search_spec_id)
+        .order_by(Listing.creation_time.asc())
+        .execution_options(yield_per=batch_size)
+    )
+
+    yield from session.execute(stmt).scalars().partitions()
+
+
+def get_new_listings(
+    session: Session,
+    after_times: Mapping[int, datetime],
+    filters: Mapping[int, ColumnElement[bool]] | None = None,
+    after_listing: tuple[datetime, int] | None = None,
+    limit: int | None = None,
+) -> Sequence[Listing]:
+    """
+    Get new listings for many searches in a single query.
+
+    after_times maps a SearchSpec id to the time after which its listings should be returned.
+    filters optionally maps a SearchSpec id to an extra condition its listings (joined with their
+    ListingContent) must satisfy.
+    Listings are ordered by creation time and then id.
+
+    Results can be fetched a page at a time by passing a limit, and then the (creation_time, id) of
+    the last listing of each page as after_listing to get the next page. Each page is an index range
+    scan, however many listings came before it.
+    """
+    if not after_times:
+        return []
+    if filters is None:
+        filters = {}
+
+    stmt = (
+        _select_listings_with_content()
+        .where(
+            or_(
+                *(
+                    and_(
+                        Listing.search_spec_id == search_spec_id,
+                        Listing.creation_time > after_time,
+                        filters.get(search_spec_id, true()),
+                    )
+                    for search_spec_id, after_time in after_times.items()
+                )
+            )
+        )
+        .order_by(Listing.creation_time.asc(), Listing.id.asc())
+        .limit(limit)
+    )
+    if after_listing is not None:
+        creation_time, listing_id = after_listing
+        stmt = stmt.where(
+            tuple_(Listing.creation_time, Listing.id)
+            > tuple_(literal(creation_time), literal(listing_id))
+        )
+
+    return session.execute(stmt).scalars().all()
+
+
+def get_first_new_listing_times(
+    session: Session, after_times: Iterable[tuple[int, datetime]]
+) -> dict[tuple[int, datetime], tuple[datetime, datetime]]:
+    """
+    Get the creation time and save time of the earliest new listing for many searches.
+
+    after_times are pairs of a SearchSpec id and the time after which its listings are considered
+    new. Several searches may watch the same SearchSpec since different times, so each pair is
+    looked up separately. Returns a map of each pair which has new listings to the (creation_time,
+    created_at) of its earliest new listing.
+    """
+    after_times = list(dict.fromkeys(after_times))
+    if not after_times:
+        return {}
+
+    # one index seek for the earliest listing after each time
+    first_new_listings = [
+        select(literal(i).label("after_time_index"), Listing.creation_time, Listing.created_at)
+        .where(Listing.search_spec_id == search_spec_id, Listing.creation_time > after_time)
+        .order_by(Listing.creation_time.asc())
+        .limit(1)
+        .subquery()
+        for i, (search_spec_id, after_time) in enumerate(after_times)
+    ]
+    stmt = union_all(*(select(first_new_listing) for first_new_listing in first_new_listings))
+
+    return {
+        after_times[after_time_index]: (creation_time, created_at)
+        for after_time_index, creation_time, created_at in session.execute(stmt)
+    }
+
+
+def add_listings(
+    session: Session, search_spec_id: int, listings: Sequence[BaseListing]
+) -> Sequence[Listing]:
+    """
+    Save new listings for a search with one INSERT statement for their content and one for the
+    listings themselves, per batch of _INSERT_BATCH_SIZE listings.
+
+    Content which is already saved, because another search found the same listing (matched by URL),
+    is shared rather than written again. It is updated if the details have changed since, e.g. if
+    the price of the listing was edited.
+    Listings which are already saved for this search (matched by URL) are skipped. Listings without
+    a URL are never matched, so are always inserted. Returns only the listings which were newly
+    inserted.
+    """
+    inserted: list[Listing] = []
+    for i in range(0, len(listings), _INSERT_BATCH_SIZE):
+        inserted.extend(
+            _add_listings_batch(session, search_spec_id, listings[i : i + _INSERT_BATCH_SIZE])
+        )
+    return inserted
+
+
+def _add_listings_batch(
+    session: Session, search_spec_id: int, listings: Sequence[BaseListing]
+) -> Sequence[Listing]:
+    insert = sqlite.insert if session.get_bind().dialect.name == "sqlite" else postgresql.insert
+    listing_jsons = [listing.model_dump_json() for listing in listings]
+    content_keys = [
+        ListingContent.make_content_key(listing_json, getattr(listing, "url", None))
+        for listing, listing_json in zip(listings, listing_jsons)
+    ]
+
+    content_stmt = insert(ListingContent).values(
+        [
+            {"content_key": content_key, "listing_json": listing_json}
+            for content_key, listing_json in dict(zip(content_keys, listing_jsons)).items()
+        ]
+    )
+    session.execute(
+        content_stmt.on_conflict_do_update(
+            index_elements=[ListingContent.content_key],
+            set_={
+                "listing_json": content_stmt.excluded.listing_json,
+                "version": ListingContent.version + 1,
+            },
+            where=ListingContent.listing_json != content_stmt.excluded.listing_json,
+        )
+    )
+    contents = session.execute(
+        select(ListingContent)
+        .where(ListingContent.content_key.in_(set(content_keys)))
+        .execution_options(populate_existing=True)
+    ).scalars()
+    content_ids = {content.content_key: content.id for content in contents}
+
+    stmt = (
+        insert(Listing)
+        .values(
+            [
+                {
+                    "search_spec_id": search_spec_id,
+                    "content_id": content_ids[content_key],
+                    "url": getattr(listing, "url", None),
+                    "creation_time": listing.creation_time,
+                }
+                for listing, content_key in zip(listings, content_keys)
+            ]
+        )
+        .on_conflict_do_nothing(index_elements=[Listing.search_spec_id, Listing.url])
+        .returning(Listing)
+    )
+    inserted = session.execute(stmt).scalars().all()
+
+    # the content is already loaded, so is attached directly instead of being loaded again for each
+    # listing when it is first used
+    for listing in inserted:
+        set_committed_value(listing, "content", session.get(ListingContent, listing.content_id))
+    return inserted
+
+
 def get_last_listing(session: Session, search_spec_id: int) -> Listing | None:
     stmt = (
         select(Listing)
@@ -27,3 +236,152 @@ def get_last_listing(session: Session, search_spec_id: int) -> Listing | None:
     )
 
     return session.execute(stmt).scalars().first()
+
+
+def count_listings(session: Session, search_spec_id: int, after_time: datetime) -> int:
+    """
+    Count the listings found for a search since the given time.
+    """
+    stmt = (
+        select(func.count())
+        .select_from(Listing)
+        .where(Listing.search_spec_id == search_spec_id)
+        .where(Listing.created_at > after_time)
+    )
+
+    return session.execute(stmt).scalar_one()
+
+
+def get_listing_urls(session: Session, search_spec_id: int, after_time: datetime) -> set[str]:
+    """
+    Get the URLs of all listings found for a search since the given time.
+    """
+    stmt = (
+        select(Listing.url)
+        .where(Listing.search_spec_id == search_spec_id)
+        .where(Listing.created_at > after_time)
+    )
+
+    return {url for url in session.execute(stmt).scalars() if url is not None}
+
+
+def get_listings_by_price(
+    session: Session,
+    search_spec_id: int,
+    min_price: float | None = None,
+    max_price: float | None = None,
+) -> Sequence[Listing]:
+    """
+    Get the saved listings for a search within a price range, most recent first.
+
+    Only applies to listings with a price field. On Postgres this uses the listing price index.
+    """
+    price = json_field_float(ListingContent.listing_json, "price")
+    stmt = (
+        _select_listings_with_content()
+        .where(Listing.search_spec_id == search_spec_id)
+        .where(price.is_not(None))
+        .order_by(Listing.creation_time.desc())
+    )
+    if min_price is not None:
+        stmt = stmt.where(price >= min_price)
+    if max_price is not None:
+        stmt = stmt.where(price <= max_price)
+
+    return session.execute(stmt).scalars().all()
+
+
+def get_listings_by_title(session: Session, search_spec_id: int, title: str) -> Sequence[Listing]:
+    """
+    Get the saved listings for a search with the given title (ignoring case), most recent first.
+
+    Useful for finding reposts of the same item. On Postgres this uses the listing title index.
+    """
+    stmt = (
+        _select_listings_with_content()
+        .where(Listing.search_spec_id == search_spec_id)
+        .where(func.lower(json_field_text(ListingContent.listing_json, "title")) == title.lower())
+        .order_by(Listing.creation_time.desc())
+    )
+
+    return session.execute(stmt).scalars().all()
+
+
+def _select_listing_ids_before(
+    before: datetime, limit: int, unwatched_only: bool
+) -> Select[tuple[int]]:
+    stmt = (
+        select(Listing.id)
+        .where(Listing.created_at < before)
+        .order_by(Listing.created_at.asc())
+        .limit(limit)
+    )
+    if unwatched_only:
+        stmt = stmt.where(Listing.search_spec_id.not_in(select(NotifierSearch.search_spec_id)))
+    return stmt
+
+
+def get_listings_before(
+    session: Session, before: datetime, limit: int, unwatched_only: bool = False
+) -> Sequence[Listing]:
+    """
+    Get up to limit of the oldest listings saved before the given time, with their content.
+
+    These are the listings which delete_listings_before would delete, for archiving them first.
+    """
+    stmt = (
+        select(Listing)
+        .where(Listing.id.in_(_select_listing_ids_before(before, limit, unwatched_only)))
+        .order_by(Listing.created_at.asc())
+    )
+
+    return session.execute(stmt).scalars().all()
+
+
+def delete_listings_before(
+    session: Session, before: datetime, limit: int, unwatched_only: bool = False
+) -> Sequence[int]:
+    """
+    Delete up to limit of the oldest listings saved before the given time.
+
+    If unwatched_only is set, only listings of searches which no notifier is watching are deleted.
+    Returns the ids of the deleted listings, so that fewer than limit means there are none left to
+    delete. Only the ids are selected, so the content of the listings is never loaded.
+    """
+    stmt = (
+        delete(Listing)
+        .where(Listing.id.in_(_select_listing_ids_before(before, limit, unwatched_only)))
+        .returning(Listing.id)
+    )
+
+    return session.execute(stmt, execution_options={"synchronize_session": False}).scalars().all()
+
+
+def delete_listings(session: Session, listing_ids: Iterable[int]) -> None:
+    session.execute(
+        delete(Listing).where(Listing.id.in_(list(listing_ids))),
+        execution_options={"synchronize_session": False},
+    )
+
+
+def delete_unreferenced_listing_contents(session: Session, limit: int) -> int:
+    """
+    Delete up to limit of the saved listing contents which no listing refers to any more.
+
+    Returns the number of contents deleted, so that fewer than limit means there are none left.
+    """
+    unreferenced_content = aliased(ListingContent)
+    candidate_ids = (
+        select(unreferenced_content.id)
+        .where(~exists().where(Listing.content_id == unreferenced_content.id))
+        .limit(limit)
+    )
+    # checked again in the DELETE itself, in case a listing referring to the content has been
+    # saved since the candidates were selected
+    stmt = delete(ListingContent).where(
+        ListingContent.id.in_(candidate_ids),
+        ~exists().where(Listing.content_id == ListingContent.id),
+    )
+
+    result = session.execute(stmt, execution_options={"synchronize_session": False})
+    return result.rowcount
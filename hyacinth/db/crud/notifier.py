@@ -1,12 +1,14 @@
 from __future__ import annotations
 
 import logging
-from typing import TYPE_CHECKING
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Mapping
 
 import discord
-from sqlalchemy.orm import Session
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session, selectinload
 
-from hyacinth.db.models import ChannelNotifierState
+from hyacinth.db.models import ChannelNotifierState, NotifierSearch
 
 if TYPE_CHECKING:
     from hyacinth.monitor import SearchMonitor
@@ -15,6 +17,18 @@ if TYPE_CHECKING:
 _logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class NotifierStateValues:
+    """
+    The settings of a notifier which can be changed after it is created.
+    """
+
+    paused: bool
+    notification_frequency_seconds: int
+    home_latitude: float | None
+    home_longitude: float | None
+
+
 def add_notifier_state(session: Session, notifier: ListingNotifier) -> ChannelNotifierState:
     from hyacinth.notifier import ChannelNotifier
 
@@ -33,29 +47,39 @@ def add_notifier_state(session: Session, notifier: ListingNotifier) -> ChannelNo
     return notifier_state
 
 
-def save_notifier_state(session: Session, notifier: ListingNotifier) -> None:
-    from hyacinth.notifier import ChannelNotifier
+def update_notifier_states(session: Session, states: Mapping[int, NotifierStateValues]) -> None:
+    """
+    Save the settings of many ChannelNotifierStates (by id) in a single batched UPDATE.
 
-    if not isinstance(notifier, ChannelNotifier):
-        raise NotImplementedError(f"{type(notifier)} not implemented")
-    if notifier.config.id is None:
-        raise ValueError("Cannot save notifier state with no ID")
-
-    _logger.debug(f"Saving notifier state for channel {notifier.channel.id}")
-    notifier_state = (
-        session.query(ChannelNotifierState)
-        .filter(ChannelNotifierState.id == notifier.config.id)
-        .one()
+    Notifiers which have since been deleted are skipped.
+    """
+    if not states:
+        return
+
+    _logger.debug(f"Saving notifier state for {len(states)} notifiers")
+    stmt = (
+        update(ChannelNotifierState)
+        .where(ChannelNotifierState.id == bindparam("notifier_id"))
+        .values(
+            paused=bindparam("new_paused"),
+            notification_frequency_seconds=bindparam("new_notification_frequency_seconds"),
+            home_latitude=bindparam("new_home_latitude"),
+            home_longitude=bindparam("new_home_longitude"),
+        )
+    )
+    session.connection().execute(
+        stmt,
+        [
+            {
+                "notifier_id": notifier_id,
+                "new_paused": values.paused,
+                "new_notification_frequency_seconds": values.notification_frequency_seconds,
+                "new_home_latitude": values.home_latitude,
+                "new_home_longitude": values.home_longitude,
+            }
+            for notifier_id, values in states.items()
+        ],
     )
-
-    notifier_state.paused = notifier.config.paused
-    notifier_state.notification_frequency_seconds = notifier.config.notification_frequency_seconds
-    if notifier.config.home_location is not None:
-        notifier_state.home_latitude = notifier.config.home_location[0]
-        notifier_state.home_longitude = notifier.config.home_location[1]
-    else:
-        notifier_state.home_latitude = None
-        notifier_state.home_longitude = None
 
 
 def get_channel_notifiers(
@@ -64,12 +88,19 @@ def get_channel_notifiers(
     """
     Get all saved ChannelNotifiers from the database.
 
+    Notifiers, their searches and filters are loaded together in a fixed number of queries.
+
     If a stale notifier is encountered (for a channel that no longer exists), it is automatically
     deleted from the database.
     """
     from hyacinth.notifier import ChannelNotifier
 
-    saved_states: list[ChannelNotifierState] = session.query(ChannelNotifierState).all()
+    # load every relationship used by the notifiers up front, in a fixed number of queries
+    stmt = select(ChannelNotifierState).options(
+        selectinload(ChannelNotifierState.active_searches).selectinload(NotifierSearch.search_spec),
+        selectinload(ChannelNotifierState.filters),
+    )
+    saved_states = session.execute(stmt).scalars().all()
 
     notifiers: list[ChannelNotifier] = []
     stale_notifiers: list[ChannelNotifierState] = []
@@ -2,8 +2,9 @@ from __future__ import annotations
 
 import logging
 from datetime import datetime
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Mapping
 
+from sqlalchemy import bindparam, update
 from sqlalchemy.orm import Session
 
 from hyacinth.db.models import NotifierSearch, SearchSpec
@@ -30,3 +31,27 @@ def add_notifier_search(
     )
     session.add(notifier_search)
     return notifier_search
+
+
+def update_last_notified(session: Session, last_notified: Mapping[int, datetime]) -> None:
+    """
+    Save the last_notified times of many NotifierSearches (by id) in a single batched UPDATE.
+
+    NotifierSearches which have since been deleted are skipped.
+    """
+    if not last_notified:
+        return
+
+    _logger.debug(f"Updating last_notified times for {len(last_notified)} notifier searches")
+    stmt = (
+        update(NotifierSearch)
+        .where(NotifierSearch.id == bindparam("notifier_search_id"))
+        .values(last_notified=bindparam("new_last_notified"))
+    )
+    session.connection().execute(
+        stmt,
+        [
+            {"notifier_search_id": notifier_search_id, "new_last_notified": notified_time}
+            for notifier_search_id, notified_time in last_notified.items()
+        ],
+    )
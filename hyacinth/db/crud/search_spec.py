@@ -1,7 +1,7 @@
-import json
 from typing import Any
 
 from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
 
 from hyacinth.db.models import SearchSpec
@@ -10,22 +10,36 @@ from hyacinth.db.models import SearchSpec
 def add_search_spec(
     session: Session, plugin_path: str, search_params_json: dict[str, Any]
 ) -> SearchSpec:
-    dumped_json = json.dumps(search_params_json)
+    """
+    Get the search spec for a plugin and search params, creating it if it does not exist yet.
+
+    Search specs are looked up by a hash of their canonical search params JSON, so search params
+    which only differ in key order share a spec. Creating a spec is an upsert, so concurrent calls
+    for the same search also share one.
+    """
+    spec = SearchSpec.from_search_params(plugin_path, search_params_json)
 
     # check if there is already a search spec with this plugin path and search params
     stmt = (
         select(SearchSpec)
-        .where(SearchSpec.plugin_path == plugin_path)
-        .where(SearchSpec.search_params_json == dumped_json)
+        .where(SearchSpec.plugin_path == spec.plugin_path)
+        .where(SearchSpec.search_params_hash == spec.search_params_hash)
     )
     if (existing_spec := session.execute(stmt).scalars().first()) is not None:
         return existing_spec
 
-    # otherwise create a new search spec
-    spec = SearchSpec(
-        plugin_path=plugin_path,
-        search_params_json=dumped_json,
+    # otherwise create a new search spec, unless another session has just created it
+    insert = sqlite.insert if session.get_bind().dialect.name == "sqlite" else postgresql.insert
+    session.execute(
+        insert(SearchSpec)
+        .values(
+            plugin_path=spec.plugin_path,
+            search_params_json=spec.search_params_json,
+            search_params_hash=spec.search_params_hash,
+        )
+        .on_conflict_do_nothing(
+            index_elements=[SearchSpec.plugin_path, SearchSpec.search_params_hash]
+        )
     )
-    session.add(spec)
 
-    return spec
+    return session.execute(stmt).scalars().one()
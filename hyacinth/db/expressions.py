@@ -0,0 +1,48 @@
+from typing import Any
+
+from sqlalchemy import ColumnElement, ColumnExpressionArgument, Float, String, cast
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.compiler import SQLCompiler
+from sqlalchemy.sql.functions import FunctionElement
+
+
+class json_field_text(FunctionElement[str]):
+    """
+    The text of a top-level field of a JSON document column.
+
+    Evaluates to NULL if the field is missing or null. Numbers are returned as their text
+    representation on Postgres and as numbers on SQLite, so should be cast before comparing.
+    """
+
+    type = String()
+    inherit_cache = True
+    name = "json_field_text"
+
+
+@compiles(json_field_text, "postgresql")
+def _compile_json_field_text_postgresql(
+    element: json_field_text, compiler: SQLCompiler, **kw: Any
+) -> str:
+    # JSON documents are stored as JSONB on Postgres
+    document, field = element.clauses
+    return f"({compiler.process(document, **kw)} ->> {compiler.process(field, **kw)})"
+
+
+@compiles(json_field_text, "sqlite")
+def _compile_json_field_text_sqlite(
+    element: json_field_text, compiler: SQLCompiler, **kw: Any
+) -> str:
+    document, field = element.clauses
+    return (
+        f"json_extract({compiler.process(document, **kw)}, '$.' || {compiler.process(field, **kw)})"
+    )
+
+
+def json_field_float(document: ColumnExpressionArgument[str], field: str) -> ColumnElement[float]:
+    """
+    The numeric value of a top-level field of a JSON document column.
+
+    Expression indexes on listing fields are defined with the same expression, so queries must use
+    it for the indexes to apply.
+    """
+    return cast(json_field_text(document, field), Float)
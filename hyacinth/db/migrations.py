@@ -0,0 +1,283 @@
+"""
+Schema migrations for existing databases.
+
+New tables (and their columns and indexes) are created by `Base.metadata.create_all`, but
+create_all does not alter tables which already exist. Each migration here brings a database created
+by an older version of Hyacinth up to date with a change to the models. Migrations are run in order
+whenever the schema may have changed, so they must be idempotent.
+"""
+
+import hashlib
+import json
+import logging
+from typing import Callable
+
+from sqlalchemy import (
+    Column,
+    Connection,
+    Dialect,
+    Engine,
+    MetaData,
+    String,
+    Table,
+    delete,
+    insert,
+    select,
+    text,
+)
+from sqlalchemy.schema import CreateIndex, CreateTable
+
+from hyacinth.db.models import Base, SearchSpec
+from hyacinth.settings import get_settings
+
+settings = get_settings()
+_logger = logging.getLogger(__name__)
+
+# identifies the schema which the database was last brought up to date with. This is kept out of
+# the models' metadata, since it is managed here rather than by create_all.
+_schema_version = Table(
+    "schema_version", MetaData(), Column("fingerprint", String, primary_key=True)
+)
+
+
+def _add_listing_url(connection: Connection) -> None:
+    connection.execute(text("ALTER TABLE listing ADD COLUMN IF NOT EXISTS url VARCHAR"))
+    # lookups by URL are served by uq_listing_search_spec_id_url, so an index on the URL alone
+    # (created by earlier versions of this migration) only slows down writes
+    connection.execute(text("DROP INDEX IF EXISTS ix_listing_url"))
+
+
+def _add_listing_unique_url(connection: Connection) -> None:
+    index_exists = connection.execute(
+        text("SELECT to_regclass('uq_listing_search_spec_id_url')")
+    ).scalar()
+    if index_exists is not None:
+        return
+
+    _logger.info("Removing duplicate listings before adding unique constraint")
+    connection.execute(
+        text(
+            "UPDATE listing SET url = listing_json::json ->> 'url'"
+            " WHERE url IS NULL AND listing_json::json ->> 'url' IS NOT NULL"
+        )
+    )
+    connection.execute(
+        text(
+            "DELETE FROM listing a USING listing b"
+            " WHERE a.search_spec_id = b.search_spec_id AND a.url = b.url AND a.id > b.id"
+        )
+    )
+    connection.execute(
+        text("CREATE UNIQUE INDEX uq_listing_search_spec_id_url ON listing (search_spec_id, url)")
+    )
+
+
+def _add_listing_search_spec_id_creation_time_index(connection: Connection) -> None:
+    # replaces the index on search_spec_id alone, which is a prefix of the new index
+    connection.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_listing_search_spec_id_creation_time"
+            " ON listing (search_spec_id, creation_time)"
+        )
+    )
+    connection.execute(text("DROP INDEX IF EXISTS ix_listing_search_spec_id"))
+
+
+def _move_listing_json_to_listing_content(connection: Connection) -> None:
+    column_exists = connection.execute(
+        text(
+            "SELECT 1 FROM information_schema.columns"
+            " WHERE table_name = 'listing' AND column_name = 'listing_json'"
+        )
+    ).scalar()
+    if column_exists is None:
+        return
+
+    # listing_content itself is created by create_all, with listing_json as JSONB, so the JSON is
+    # converted as it is copied rather than by rewriting the listing table first. Listings without a
+    # URL are keyed on a hash of their JSON text here, which may be formatted differently to the
+    # JSON saved by add_listings, so those may not share content with listings saved afterwards.
+    # This only costs some duplication until the existing listings expire.
+    _logger.info("Moving listing JSON to listing_content, this may take a while")
+    content_key = (
+        "COALESCE(listing.url,"
+        " 'sha256:' || encode(sha256(convert_to(listing.listing_json::text, 'UTF8')), 'hex'))"
+    )
+    connection.execute(
+        text(
+            "ALTER TABLE listing ADD COLUMN IF NOT EXISTS content_id INTEGER"
+            " REFERENCES listing_content (id)"
+        )
+    )
+    # the latest saved details of each listing are kept, as add_listings does
+    connection.execute(
+        text(
+            "INSERT INTO listing_content (content_key, listing_json, created_at)"
+            f" SELECT DISTINCT ON ({content_key}) {content_key}, listing.listing_json::jsonb,"
+            " listing.created_at FROM listing"
+            f" ORDER BY {content_key}, listing.created_at DESC"
+            " ON CONFLICT (content_key) DO NOTHING"
+        )
+    )
+    connection.execute(
+        text(
+            "UPDATE listing SET content_id = listing_content.id FROM listing_content"
+            f" WHERE listing_content.content_key = {content_key}"
+        )
+    )
+    connection.execute(text("ALTER TABLE listing ALTER COLUMN content_id SET NOT NULL"))
+    connection.execute(
+        text("CREATE INDEX IF NOT EXISTS ix_listing_content_id ON listing (content_id)")
+    )
+    # also drops the indexes on listing fields, which are now on listing_content
+    connection.execute(text("ALTER TABLE listing DROP COLUMN listing_json"))
+
+
+def _add_search_spec_search_params_hash(connection: Connection) -> None:
+    column_exists = connection.execute(
+        text(
+            "SELECT 1 FROM information_schema.columns"
+            " WHERE table_name = 'searchspec' AND column_name = 'search_params_hash'"
+        )
+    ).scalar()
+    if column_exists is not None:
+        return
+
+    # hashes are of the canonical search params JSON, which can only be computed in Python
+    connection.execute(text("ALTER TABLE searchspec ADD COLUMN search_params_hash VARCHAR"))
+    spec_ids: dict[tuple[str, str], list[int]] = {}  # (plugin path, hash) -> ids, oldest first
+    for spec_id, plugin_path, search_params_json in connection.execute(
+        text("SELECT id, plugin_path, search_params_json FROM searchspec ORDER BY id")
+    ):
+        spec = SearchSpec.from_search_params(plugin_path, json.loads(search_params_json))
+        spec_ids.setdefault((plugin_path, spec.search_params_hash), []).append(spec_id)
+
+    for (_, search_params_hash), (spec_id, *duplicate_ids) in spec_ids.items():
+        if duplicate_ids:
+            _logger.info(f"Merging duplicate search specs {duplicate_ids} into {spec_id}")
+            _merge_search_specs(connection, spec_id, duplicate_ids)
+        connection.execute(
+            text("UPDATE searchspec SET search_params_hash = :hash WHERE id = :id"),
+            {"hash": search_params_hash, "id": spec_id},
+        )
+
+    connection.execute(text("ALTER TABLE searchspec ALTER COLUMN search_params_hash SET NOT NULL"))
+    connection.execute(
+        text(
+            "CREATE UNIQUE INDEX uq_searchspec_plugin_path_search_params_hash"
+            " ON searchspec (plugin_path, search_params_hash)"
+        )
+    )
+
+
+def _merge_search_specs(connection: Connection, spec_id: int, duplicate_ids: list[int]) -> None:
+    params = {"spec_id": spec_id, "duplicate_ids": duplicate_ids}
+    connection.execute(
+        text(
+            "UPDATE notifiersearch SET search_spec_id = :spec_id"
+            " WHERE search_spec_id = ANY(:duplicate_ids)"
+        ),
+        params,
+    )
+    # listings are unique per search and URL, so listings which were saved by more than one of the
+    # duplicate searches are only kept once
+    connection.execute(
+        text(
+            "DELETE FROM listing a USING listing b"
+            " WHERE a.search_spec_id = ANY(:duplicate_ids) AND b.search_spec_id = :spec_id"
+            " AND a.url = b.url"
+        ),
+        params,
+    )
+    connection.execute(
+        text(
+            "DELETE FROM listing a USING listing b"
+            " WHERE a.search_spec_id = ANY(:duplicate_ids) AND b.search_spec_id = ANY(:duplicate_ids)"
+            " AND a.url = b.url AND a.id > b.id"
+        ),
+        params,
+    )
+    connection.execute(
+        text(
+            "UPDATE listing SET search_spec_id = :spec_id WHERE search_spec_id = ANY(:duplicate_ids)"
+        ),
+        params,
+    )
+    connection.execute(text("DELETE FROM searchspec WHERE id = ANY(:duplicate_ids)"), params)
+
+
+MIGRATIONS: list[Callable[[Connection], None]] = [
+    _add_listing_url,
+    _add_listing_unique_url,
+    _add_listing_search_spec_id_creation_time_index,
+    _move_listing_json_to_listing_content,
+    _add_search_spec_search_params_hash,
+]
+
+
+def _create_listing_title_trigram_index(connection: Connection) -> None:
+    """
+    Index listing titles for substring searches, such as keyword filter rules.
+
+    Requires the pg_trgm extension, which the database user may not be allowed to create, so this
+    index is optional.
+    """
+    connection.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    connection.execute(
+        text(
+            "CREATE INDEX IF NOT EXISTS ix_listing_content_title_trigram ON listing_content"
+            " USING gin (lower((listing_json ->> 'title')) gin_trgm_ops)"
+        )
+    )
+
+
+def run_migrations(connection: Connection) -> None:
+    if connection.dialect.name != "postgresql":
+        _logger.debug(f"Skipping migrations for unsupported dialect {connection.dialect.name}")
+        return
+
+    for migration in MIGRATIONS:
+        _logger.debug(f"Running migration {migration.__name__}")
+        migration(connection)
+
+    if settings.listing_title_trigram_index_enabled:
+        _create_listing_title_trigram_index(connection)
+
+
+def upgrade_schema(engine: Engine) -> None:
+    """
+    Create any missing tables and run migrations, unless the schema is already up to date.
+
+    Checking the schema fingerprint takes a single query, so start-up does not pay for create_all
+    and every migration when nothing has changed since the last start-up.
+    """
+    fingerprint = schema_fingerprint(engine.dialect)
+    with engine.begin() as connection:
+        _schema_version.create(connection, checkfirst=True)
+        current_fingerprint = connection.execute(select(_schema_version.c.fingerprint)).scalar()
+        if current_fingerprint == fingerprint:
+            _logger.info("Database schema is up to date")
+            return
+
+        _logger.info("Upgrading database schema")
+        Base.metadata.create_all(connection)
+        run_migrations(connection)
+        connection.execute(delete(_schema_version))
+        connection.execute(insert(_schema_version).values(fingerprint=fingerprint))
+
+
+def schema_fingerprint(dialect: Dialect) -> str:
+    """
+    Hash of everything which determines the schema: the DDL of the models and the migrations.
+    """
+    statements = []
+    for table in Base.metadata.sorted_tables:
+        statements.append(str(CreateTable(table).compile(dialect=dialect)))
+        statements.extend(
+            str(CreateIndex(index).compile(dialect=dialect))
+            for index in sorted(table.indexes, key=lambda index: str(index.name))
+        )
+    statements.extend(migration.__name__ for migration in MIGRATIONS)
+    statements.append(f"trigram_index={settings.listing_title_trigram_index_enabled}")
+
+    return hashlib.sha256("\n".join(statements).encode()).hexdigest()
@@ -1,13 +1,17 @@
 from __future__ import annotations
 
+import hashlib
+import json
 from datetime import datetime
 from functools import cached_property
-from typing import TYPE_CHECKING
+from typing import TYPE_CHECKING, Any
 
 import sqlalchemy
-from sqlalchemy import DateTime, ForeignKey, func
+from sqlalchemy import DateTime, ForeignKey, Index, func
 from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 
+from hyacinth.db.expressions import json_field_float, json_field_text
+from hyacinth.db.types import JSONText
 from hyacinth.enums import RuleType
 
 if TYPE_CHECKING:
@@ -19,6 +23,58 @@ class Base(DeclarativeBase):
     pass
 
 
+class ListingContent(Base):
+    """
+    The details of a listing, shared between every search which found it.
+
+    The same posting often matches several searches, such as ones for overlapping categories or
+    nearby areas. Its details are only stored once, addressed by the listing URL, and the Listing of
+    each search refers to them. Listings without a URL are addressed by a hash of their JSON instead.
+    """
+
+    __tablename__ = "listing_content"
+    __table_args__ = (
+        # content is saved with INSERT ... ON CONFLICT on its key, so it is only written once
+        Index("uq_listing_content_content_key", "content_key", unique=True),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+
+    # the listing URL, or a hash of the listing JSON for listings without one
+    content_key: Mapped[str]
+    # details of listing are plugin-specific
+    listing_json: Mapped[str] = mapped_column(JSONText)
+    # incremented whenever the details change (e.g. the price of a listing is edited), so that
+    # anything cached for the old details is not reused
+    version: Mapped[int] = mapped_column(default=1)
+
+    # when we first saw it
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=func.now())
+
+    @classmethod
+    def from_json(cls, listing_json: str, url: str | None = None) -> ListingContent:
+        return cls(content_key=cls.make_content_key(listing_json, url), listing_json=listing_json)
+
+    @staticmethod
+    def make_content_key(listing_json: str, url: str | None) -> str:
+        # the JSON of a listing can change between scrapes even when the listing has not (e.g. a
+        # fresh thumbnail URL each time images are mirrored to S3), so it is only hashed as a last
+        # resort
+        if url is not None:
+            return url
+        return "sha256:" + hashlib.sha256(listing_json.encode()).hexdigest()
+
+
+# expression indexes on listing fields which are commonly filtered on, for the plugins which provide
+# them. These index into JSONB, so are only created on Postgres.
+Index("ix_listing_content_price", json_field_float(ListingContent.listing_json, "price")).ddl_if(
+    dialect="postgresql"
+)
+Index(
+    "ix_listing_content_title", func.lower(json_field_text(ListingContent.listing_json, "title"))
+).ddl_if(dialect="postgresql")
+
+
 class Listing(Base):
     """
     A Listing is a single result from a search.
@@ -28,16 +84,25 @@ class Listing(Base):
     efficiently check the database for new listings.
 
     All other informational fields about the listing are plugin-specific and are stored as a JSON
-    blob. Common fields might include a title, URL, price, images, and description, but plugin
-    authors are free to store whatever information they want.
+    blob in ListingContent, which is shared with any other searches that found the same listing.
+    Common fields might include a title, URL, price, images, and description, but plugin authors
+    are free to store whatever information they want.
     """
 
     __tablename__ = "listing"
+    __table_args__ = (
+        # a listing is only saved once per search, which makes saving listings idempotent
+        Index("uq_listing_search_spec_id_url", "search_spec_id", "url", unique=True),
+        # listings are almost always queried for a search in order of creation time
+        Index("ix_listing_search_spec_id_creation_time", "search_spec_id", "creation_time"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
 
-    search_spec_id: Mapped[int] = mapped_column(ForeignKey("searchspec.id"), index=True)
-    listing_json: Mapped[str] = mapped_column()  # details of listing are plugin-specific
+    search_spec_id: Mapped[int] = mapped_column(ForeignKey("searchspec.id"))
+    content_id: Mapped[int] = mapped_column(ForeignKey("listing_content.id"), index=True)
+    # used to skip scraping listings which have already been seen, if the plugin provides it
+    url: Mapped[str | None]
     # post date of the listing itself
     creation_time: Mapped[datetime] = mapped_column(DateTime(timezone=True), index=True)
 
@@ -50,12 +115,29 @@ class Listing(Base):
     )
 
     search_spec: Mapped[SearchSpec] = relationship("SearchSpec")
+    # the details are needed whenever a listing is, so are loaded along with it
+    content: Mapped[ListingContent] = relationship("ListingContent", lazy="joined", innerjoin=True)
+
+    @property
+    def listing_json(self) -> str:
+        return self.content.listing_json
+
+    @property
+    def content_cache_key(self) -> tuple[int, int] | None:
+        """
+        Identifies the current details of a saved listing, for caching anything derived from them.
+        """
+        if self.content_id is None:
+            return None
+        return (self.content_id, self.content.version)
 
     @classmethod
     def from_base_listing(cls, base_listing: BaseListing, search_spec_id: int) -> Listing:
+        url = getattr(base_listing, "url", None)
         return cls(
             search_spec_id=search_spec_id,
-            listing_json=base_listing.model_dump_json(),
+            content=ListingContent.from_json(base_listing.model_dump_json(), url),
+            url=url,
             creation_time=base_listing.creation_time,
         )
 
@@ -73,16 +155,43 @@ class SearchSpec(Base):
     """
 
     __tablename__ = "searchspec"
+    __table_args__ = (
+        # a search is only saved once, however its search params are ordered
+        Index(
+            "uq_searchspec_plugin_path_search_params_hash",
+            "plugin_path",
+            "search_params_hash",
+            unique=True,
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     plugin_path: Mapped[str] = mapped_column(index=True)
     search_params_json: Mapped[str] = mapped_column()  # search params are plugin-specific
+    # sha256 of the canonical search params JSON, which identifies the search for the plugin
+    search_params_hash: Mapped[str]
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=func.now())
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), default=func.now(), onupdate=func.now()
     )
 
+    @classmethod
+    def from_search_params(cls, plugin_path: str, search_params: dict[str, Any]) -> SearchSpec:
+        search_params_json = cls.canonical_search_params_json(search_params)
+        return cls(
+            plugin_path=plugin_path,
+            search_params_json=search_params_json,
+            search_params_hash=hashlib.sha256(search_params_json.encode()).hexdigest(),
+        )
+
+    @staticmethod
+    def canonical_search_params_json(search_params: dict[str, Any]) -> str:
+        """
+        Serialize search params the same way whatever order their keys are in.
+        """
+        return json.dumps(search_params, sort_keys=True)
+
     @cached_property
     def plugin(self) -> Plugin:
         from hyacinth.plugin import get_plugin
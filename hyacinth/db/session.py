@@ -1,16 +1,38 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-
-from hyacinth.db.models import Base
-from hyacinth.settings import get_settings
-
-settings = get_settings()
-
-credentials = f"{settings.postgres_user}:{settings.postgres_password}"
-host = f"db:5432/{settings.postgres_user}"
-connection_string = f"postgresql://{credentials}@{host}"
-
-engine = create_engine(f"postgresql://{credentials}@{host}", future=True)
-Session = sessionmaker(engine)
-
-Base.metadata.create_all(engine)
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from hyacinth.db.migrations import upgrade_schema
+from hyacinth.settings import get_settings
+
+settings = get_settings()
+
+credentials = f"{settings.postgres_user}:{settings.postgres_password}"
+host = f"db:5432/{settings.postgres_user}"
+connection_string = f"postgresql://{credentials}@{host}"
+
+# session factories are bound to their engines by init_db, which must be called once on start-up
+# before any sessions are used. This keeps importing modules which use the database free of side
+# effects, so they can be used without a live database.
+Session = sessionmaker()
+
+# async sessions are used by code running on the event loop, so that queries do not block it.
+# crud functions take a synchronous Session and are called with AsyncSession.run_sync.
+AsyncSession = async_sessionmaker(expire_on_commit=False)
+
+
+def init_db() -> None:
+    """
+    Connect to the database and bring its schema up to date.
+    """
+    pool_options = {
+        "pool_size": settings.db_pool_size,
+        "max_overflow": settings.db_max_overflow,
+        "pool_pre_ping": settings.db_pool_pre_ping,
+    }
+    engine = create_engine(connection_string, **pool_options)
+    Session.configure(bind=engine)
+    async_engine = create_async_engine(f"postgresql+asyncpg://{credentials}@{host}", **pool_options)
+    AsyncSession.configure(bind=async_engine)
+
+    upgrade_schema(engine)
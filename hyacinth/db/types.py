@@ -0,0 +1,39 @@
+import json
+from typing import Any
+
+from sqlalchemy import Dialect, Text
+from sqlalchemy.types import TypeDecorator, TypeEngine, UserDefinedType
+
+
+class _JSONB(UserDefinedType[str]):
+    """
+    Postgres JSONB, passed to and from the driver as text without any JSON processing.
+    """
+
+    cache_ok = True
+
+    def get_col_spec(self, **kw: Any) -> str:
+        return "JSONB"
+
+
+class JSONText(TypeDecorator[str]):
+    """
+    A JSON document which is handled as a string in Python.
+
+    On Postgres the document is stored as JSONB so that fields inside it can be indexed and queried.
+    Other databases store it as text.
+    """
+
+    impl = Text
+    cache_ok = True
+
+    def load_dialect_impl(self, dialect: Dialect) -> TypeEngine[Any]:
+        if dialect.name == "postgresql":
+            return dialect.type_descriptor(_JSONB())
+        return dialect.type_descriptor(Text())
+
+    def process_result_value(self, value: Any, dialect: Dialect) -> str | None:
+        # some drivers decode JSONB values themselves
+        if value is not None and not isinstance(value, str):
+            return json.dumps(value)
+        return value
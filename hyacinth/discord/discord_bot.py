@@ -10,7 +10,7 @@ from discord import app_commands
 from discord.app_commands import Choice
 
 from hyacinth.db.crud.notifier import get_channel_notifiers
-from hyacinth.db.session import Session
+from hyacinth.db.session import Session, init_db
 from hyacinth.discord.autocomplete import (
     get_configure_autocomplete,
     get_filter_autocomplete,
@@ -27,9 +27,13 @@ from hyacinth.metrics import start_metrics_write_task
 from hyacinth.monitor import SearchMonitor
 from hyacinth.notifier import ChannelNotifier
 from hyacinth.plugin import Plugin, register_plugin
+from hyacinth.retention import start_listing_retention_task
+from hyacinth.scheduler import get_async_scheduler
 from hyacinth.settings import get_settings
+from hyacinth.state_store import start_state_flush_task
 from hyacinth.util.decorators import log_exceptions
 from hyacinth.util.geo import get_local_geolocator
+from hyacinth.util.scraping import get_browser_connection
 
 settings = get_settings()
 _logger = logging.getLogger(__name__)
@@ -53,6 +57,8 @@ class DiscordBot:
         _logger.info(f"Configured user timezone is {settings.tz}")
 
         start_metrics_write_task()
+        start_listing_retention_task()
+        start_state_flush_task()
         self.load_plugins()
         self.load_saved_notifiers()
         await self.register_commands()
@@ -63,8 +69,17 @@ class DiscordBot:
             self.plugins.append(register_plugin(plugin_path))
 
     def load_saved_notifiers(self) -> None:
-        with Session() as session:
-            notifiers = get_channel_notifiers(session, self.client, self.monitor)
+        # notification jobs are added while the scheduler is paused, so that it is woken up once
+        # for the whole batch of restored notifiers rather than once per job
+        scheduler = get_async_scheduler()
+        scheduler.pause()
+        try:
+            # the notifiers keep using the loaded objects after the session is closed, so they must
+            # not be expired when stale notifiers are deleted
+            with Session(expire_on_commit=False) as session:
+                notifiers = get_channel_notifiers(session, self.client, self.monitor)
+        finally:
+            scheduler.resume()
         for notifier in notifiers:
             self.notifiers[notifier.channel.id] = notifier
         _logger.info(f"Loaded {len(notifiers)} saved notifiers from the database!")
@@ -233,6 +248,8 @@ async def start() -> None:
     loop = asyncio.get_running_loop()
     loop.set_debug(settings.asyncio_debug_mode)
 
+    init_db()
+
     intents = discord.Intents(guilds=True)
     client = discord.Client(intents=intents, loop=loop)
     discord_bot: DiscordBot = DiscordBot(client)
@@ -250,4 +267,15 @@ async def start() -> None:
     if settings.use_local_geocoder:
         get_local_geolocator()
 
-    await client.start(settings.discord_token)
+    # similarly, open the shared browserless connection up front so the first search poll does not
+    # pay for it. if browserless is not reachable yet, the connection is retried on first use.
+    browser_connection = get_browser_connection()
+    try:
+        await browser_connection.connect()
+    except Exception:
+        _logger.exception("Could not connect to browserless, will retry when polling searches")
+
+    try:
+        await client.start(settings.discord_token)
+    finally:
+        await browser_connection.close()
@@ -1,13 +1,43 @@
 import ast
 import re
+import types
 from dataclasses import dataclass
-from typing import Any, Literal
+from functools import cached_property
+from typing import (
+    Any,
+    Callable,
+    Container,
+    Hashable,
+    Iterable,
+    Literal,
+    Union,
+    get_args,
+    get_origin,
+)
 
-from boolean import Expression
+from boolean import Expression, ParseError
+from sqlalchemy import ColumnElement, and_, false, func, not_, or_, true
 
-from hyacinth.db.models import Filter
+from hyacinth.db.expressions import json_field_float, json_field_text
+from hyacinth.db.models import Filter, ListingContent
 from hyacinth.enums import RuleType
-from hyacinth.util.boolean_algebra import evaluate_expression, parse_expression
+from hyacinth.models import BaseListing
+from hyacinth.settings import get_settings
+from hyacinth.util.boolean_algebra import algebra, compile_expression, parse_expression
+from hyacinth.util.cache import TTLCache
+from hyacinth.util.keyword_matcher import KeywordMatcher
+
+settings = get_settings()
+
+# results of applying filter sets and individual rules to listings, keyed by (filter set or rule
+# key, listing content cache key) and shared between all notifiers, so that notifiers with the same
+# rules only evaluate them once per listing
+_filter_set_results: TTLCache[tuple[Hashable, Hashable], bool] = TTLCache(
+    maxsize=settings.filter_result_cache_size, ttl_seconds=settings.filter_result_cache_ttl_seconds
+)
+_rule_results: TTLCache[tuple[Hashable, Hashable], bool] = TTLCache(
+    maxsize=settings.filter_result_cache_size, ttl_seconds=settings.filter_result_cache_ttl_seconds
+)
 
 
 @dataclass
@@ -16,16 +46,101 @@ class NumericRule:
     operand: int | float
 
 
-def test(listing: dict[str, Any], filters: list[Filter]) -> bool:
+class CompiledFilter:
+    """
+    A filter with its rule expression parsed ahead of time, so it can be applied to many listings.
+
+    Whether a rule is applied as a string or numeric rule depends on the type of the listing field,
+    so each kind of rule is parsed the first time it is needed and then reused.
+    """
+
+    def __init__(self, filter_: Filter) -> None:
+        self.field = filter_.field
+        self.rule_type = filter_.rule_type
+        self.rule_expr = filter_.rule_expr
+        # rules are case-insensitive and whitespace between tokens is not significant, so rules
+        # which differ only in those respects give the same result
+        self.key = (self.field, " ".join(self.rule_expr.lower().split()))
+
+    @cached_property
+    def string_expression(self) -> Expression:
+        return parse_string_rule_expr(self.rule_expr.lower())
+
+    @cached_property
+    def string_rule(self) -> Callable[[Container[str]], bool]:
+        return compile_expression(self.string_expression)
+
+    @cached_property
+    def numeric_rule(self) -> NumericRule:
+        return parse_numeric_rule_expr(self.rule_expr)
+
+    @cached_property
+    def keywords(self) -> frozenset[str]:
+        """
+        The keywords which the string rule looks for, or none if this is not a valid string rule.
+        """
+        try:
+            expression = self.string_expression
+        except ParseError:
+            return frozenset()
+        return frozenset(symbol.obj for symbol in expression.get_symbols())
+
+
+@dataclass
+class CompiledFilters:
+    filters: list[CompiledFilter]
+    # matches the keywords of every string rule, so each listing field is only searched once
+    keyword_matcher: KeywordMatcher
+
+    @cached_property
+    def key(self) -> frozenset[tuple[tuple[str, str], RuleType]]:
+        """
+        Identifies the filter set regardless of rule order, which does not affect the result.
+        """
+        return frozenset((filter_.key, filter_.rule_type) for filter_ in self.filters)
+
+
+def compile_filters(filters: Iterable[Filter]) -> CompiledFilters:
+    compiled_filters = [CompiledFilter(filter_) for filter_ in filters]
+    keywords = frozenset().union(*(filter_.keywords for filter_ in compiled_filters))
+    return CompiledFilters(filters=compiled_filters, keyword_matcher=KeywordMatcher(keywords))
+
+
+def test(
+    listing: dict[str, Any], filters: CompiledFilters, cache_key: Hashable | None = None
+) -> bool:
+    """
+    Check whether a listing passes a set of filters.
+
+    If the content_cache_key of a saved listing is given, the results for the filter set and each
+    of its rules are cached, and reused for any other filter set with the same rules and for every
+    search which found the same listing.
+    """
+    if cache_key is None:
+        return _test(listing, filters, cache_key)
+
+    result = _filter_set_results.get((filters.key, cache_key))
+    if result is None:
+        result = _test(listing, filters, cache_key)
+        _filter_set_results.put((filters.key, cache_key), result)
+    return result
+
+
+def _test(listing: dict[str, Any], filters: CompiledFilters, cache_key: Hashable | None) -> bool:
     and_result = True
     or_result = False
     has_no_or_rules = True
+    matched_keywords: dict[str, set[str]] = {}  # field -> keywords found in field
 
-    for filter_ in filters:
+    for filter_ in filters.filters:
         if filter_.field not in listing:
             continue
 
-        result = _apply_rule_expr(filter_.rule_expr, listing[filter_.field])
+        result = None if cache_key is None else _rule_results.get((filter_.key, cache_key))
+        if result is None:
+            result = _apply_rule(filter_, listing[filter_.field], filters, matched_keywords)
+            if cache_key is not None:
+                _rule_results.put((filter_.key, cache_key), result)
 
         if filter_.rule_type == RuleType.AND:
             and_result = and_result and result
@@ -38,17 +153,140 @@ def test(listing: dict[str, Any], filters: list[Filter]) -> bool:
     return and_result and (or_result or has_no_or_rules)
 
 
-def _apply_rule_expr(expr: str, field: Any) -> bool:
+def _apply_rule(
+    filter_: CompiledFilter,
+    field: Any,
+    filters: CompiledFilters,
+    matched_keywords: dict[str, set[str]],
+) -> bool:
     if isinstance(field, str):
-        return _apply_string_rule_expr(expr, field)
+        if filter_.field not in matched_keywords:
+            matched_keywords[filter_.field] = filters.keyword_matcher.match(field.lower())
+        return filter_.string_rule(matched_keywords[filter_.field])
     elif isinstance(field, int) or isinstance(field, float):
-        return _apply_numeric_rule_expr(expr, field)
+        return _apply_numeric_rule(filter_.numeric_rule, field)
 
     raise ValueError(f"Invalid field type: {type(field)}")
 
 
-def _apply_numeric_rule_expr(expr: str, field: float | int) -> bool:
-    rule = parse_numeric_rule_expr(expr)
+def to_sql_predicate(
+    filters: CompiledFilters, listing_cls: type[BaseListing]
+) -> ColumnElement[bool]:
+    """
+    Translate filter rules into a SQL predicate on the content of saved listings of the given type.
+
+    The predicate only narrows down the candidate listings: every listing which passes the filters
+    also satisfies the predicate, but not necessarily the other way around, so listings must still
+    be checked with test. Rules which cannot be translated are left out, and listings without a
+    value for a field are never excluded by the rules on that field.
+    """
+    and_predicates: list[ColumnElement[bool]] = []
+    or_predicates: list[ColumnElement[bool]] = []
+    all_or_rules_translated = True
+
+    for filter_ in filters.filters:
+        predicate = _rule_to_sql(filter_, listing_cls)
+        if filter_.rule_type == RuleType.AND:
+            if predicate is not None:
+                and_predicates.append(predicate)
+        elif filter_.rule_type == RuleType.OR:
+            if predicate is None:
+                all_or_rules_translated = False
+            else:
+                or_predicates.append(predicate)
+
+    # a listing may pass because of any one of the OR rules, so they can only narrow down the
+    # candidates if every one of them was translated
+    if or_predicates and all_or_rules_translated:
+        and_predicates.append(or_(*or_predicates))
+
+    return and_(true(), *and_predicates)
+
+
+def _rule_to_sql(
+    filter_: CompiledFilter, listing_cls: type[BaseListing]
+) -> ColumnElement[bool] | None:
+    field_type = _get_field_type(listing_cls, filter_.field)
+    value = json_field_text(ListingContent.listing_json, filter_.field)
+
+    if field_type is int or field_type is float:
+        try:
+            rule = filter_.numeric_rule
+        except ValueError:
+            return None
+        predicate = _numeric_rule_to_sql(
+            rule, json_field_float(ListingContent.listing_json, filter_.field)
+        )
+    elif field_type is str:
+        try:
+            expression = filter_.string_expression
+        except ParseError:
+            return None
+        # lower() in the database may not case-fold non-ASCII text the same way as Python does
+        if not all(keyword.isascii() for keyword in filter_.keywords):
+            return None
+        predicate = _string_expression_to_sql(expression, func.lower(value))
+    else:
+        return None
+
+    return or_(value.is_(None), predicate)
+
+
+def _get_field_type(listing_cls: type[BaseListing], field: str) -> type | None:
+    """
+    Get the type of a listing field, ignoring whether it is optional.
+    """
+    field_info = listing_cls.model_fields.get(field)
+    if field_info is None:
+        return None
+
+    field_type = field_info.annotation
+    if get_origin(field_type) in (Union, types.UnionType):
+        args = [arg for arg in get_args(field_type) if arg is not type(None)]
+        if len(args) != 1:
+            return None
+        field_type = args[0]
+
+    return field_type if isinstance(field_type, type) else None
+
+
+def _numeric_rule_to_sql(rule: NumericRule, value: ColumnElement[float]) -> ColumnElement[bool]:
+    if rule.operator == "<":
+        return value < rule.operand
+    elif rule.operator == "<=":
+        return value <= rule.operand
+    elif rule.operator == ">":
+        return value > rule.operand
+    elif rule.operator == ">=":
+        return value >= rule.operand
+    elif rule.operator == "=":
+        return value == rule.operand
+
+    raise ValueError(f"Invalid operator: {rule.operator}")
+
+
+def _string_expression_to_sql(
+    expression: Expression, text: ColumnElement[str]
+) -> ColumnElement[bool]:
+    if isinstance(expression, algebra.Symbol):
+        return text.contains(expression.obj, autoescape=True)
+    if expression == algebra.TRUE:
+        return true()
+    if expression == algebra.FALSE:
+        return false()
+
+    args = [_string_expression_to_sql(arg, text) for arg in expression.args]
+    if isinstance(expression, algebra.NOT):
+        return not_(args[0])
+    if isinstance(expression, algebra.AND):
+        return and_(*args)
+    if isinstance(expression, algebra.OR):
+        return or_(*args)
+
+    raise ValueError(f"Unsupported expression: {expression!r}")
+
+
+def _apply_numeric_rule(rule: NumericRule, field: float | int) -> bool:
     if rule.operator == "<":
         return field < rule.operand
     elif rule.operator == "<=":
@@ -63,13 +301,6 @@ def _apply_numeric_rule_expr(expr: str, field: float | int) -> bool:
     raise ValueError(f"Invalid operator: {rule.operator}")
 
 
-def _apply_string_rule_expr(expr: str, field: str) -> bool:
-    expr = expr.lower()
-    field = field.lower()
-    expression = parse_string_rule_expr(expr)
-    return evaluate_expression(expression, field)
-
-
 def parse_string_rule_expr(expr: str) -> Expression:
     """
     Parse a string rule expression into a boolean expression.
@@ -18,6 +18,8 @@ __buffer_lock = Lock()
 
 METRIC_SCRAPE_COUNT = "hyacinth_scrape_count"
 METRIC_POLL_JOB_EXECUTION_COUNT = "hyacinth_poll_job_execution_count"
+METRIC_POLL_QUEUE_DEPTH = "hyacinth_poll_queue_depth"
+METRIC_POLL_QUEUE_WAIT_SECONDS = "hyacinth_poll_queue_wait_seconds"
 
 
 @cache
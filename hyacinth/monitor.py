@@ -1,110 +1,217 @@
 import logging
+from dataclasses import dataclass
 from datetime import datetime, timedelta
-from typing import Sequence
+from typing import Callable, Sequence
 
-from apscheduler.job import Job
-from apscheduler.triggers.interval import IntervalTrigger
 from zoneinfo import ZoneInfo
 
+from hyacinth.db.crud.listing import add_listings as add_listings_to_db
+from hyacinth.db.crud.listing import count_listings as count_listings_in_db
 from hyacinth.db.crud.listing import get_last_listing as get_last_listing_from_db
-from hyacinth.db.crud.listing import get_listings as get_listings_from_db
+from hyacinth.db.crud.listing import get_listing_urls as get_listing_urls_from_db
 from hyacinth.db.models import Listing, SearchSpec
-from hyacinth.db.session import Session
+from hyacinth.db.session import AsyncSession
 from hyacinth.metrics import METRIC_POLL_JOB_EXECUTION_COUNT, write_metric
 from hyacinth.models import BaseListing
-from hyacinth.scheduler import get_async_scheduler
+from hyacinth.poll_scheduler import PollScheduler
 from hyacinth.settings import get_settings
 from hyacinth.util.crash_report import save_poll_failure_report
 
 settings = get_settings()
 _logger = logging.getLogger(__name__)
 
+# called with a SearchSpec id and the listings which were just saved for it
+ListingSubscriber = Callable[[int, Sequence[Listing]], None]
+
+# weight given to the most recent poll when updating a search's listing arrival rate
+ARRIVAL_RATE_SMOOTHING_FACTOR = 0.3
+
+
+@dataclass
+class ListingArrivalRate:
+    """
+    Exponentially weighted moving average of how quickly new listings are found for a search.
+    """
+
+    listings_per_second: float
+    last_poll_time: datetime
+
+    def update(self, num_new_listings: int, poll_time: datetime) -> None:
+        elapsed_seconds = (poll_time - self.last_poll_time).total_seconds()
+        if elapsed_seconds <= 0:
+            return
+
+        observed_rate = num_new_listings / elapsed_seconds
+        self.listings_per_second = (
+            ARRIVAL_RATE_SMOOTHING_FACTOR * observed_rate
+            + (1 - ARRIVAL_RATE_SMOOTHING_FACTOR) * self.listings_per_second
+        )
+        self.last_poll_time = poll_time
+
+    def polling_interval(
+        self, target_listings_per_poll: float, min_seconds: int, max_seconds: int
+    ) -> int:
+        if self.listings_per_second <= 0:
+            return max_seconds
+
+        interval = target_listings_per_poll / self.listings_per_second
+        return int(min(max(interval, min_seconds), max_seconds))
+
 
 class SearchMonitor:
     def __init__(self) -> None:
-        self.scheduler = get_async_scheduler()
-        self.search_specs: list[SearchSpec] = []
-        self.search_spec_job_mapping: dict[int, Job] = {}  # SearchSpec id -> job
+        self.poll_scheduler = PollScheduler(self.poll_search)
         self.search_spec_ref_count: dict[int, int] = {}  # SearchSpec id -> ref count
+        self.arrival_rates: dict[int, ListingArrivalRate] = {}  # SearchSpec id -> arrival rate
+        self.subscribers: dict[int, list[ListingSubscriber]] = {}  # SearchSpec id -> subscribers
+
+    def register_search(
+        self, search_spec: SearchSpec, subscriber: ListingSubscriber | None = None
+    ) -> None:
+        """
+        Start polling a search, if it is not already being polled.
+
+        If a subscriber is given, it is called with every batch of new listings saved for the search
+        until the search is removed again.
+        """
+        if subscriber is not None:
+            self.subscribers.setdefault(search_spec.id, []).append(subscriber)
 
-    def register_search(self, search_spec: SearchSpec) -> None:
         # check if there is already a scheduled task to poll this search
-        if search_spec.id in self.search_spec_job_mapping:
+        if search_spec.id in self.search_spec_ref_count:
             _logger.info("Search already exists, not registering new search")
             self.search_spec_ref_count[search_spec.id] += 1
             return
 
-        # otherwise schedule a job to periodically check results and write them to the db
-        _logger.info(f"Scheduling job for new search! {search_spec}")
-        self.search_spec_job_mapping[search_spec.id] = self.scheduler.add_job(
-            self.poll_search,
-            kwargs={"search_spec": search_spec},
-            trigger=IntervalTrigger(
-                seconds=search_spec.plugin.polling_interval(search_spec.search_params)
-            ),
-            next_run_time=datetime.now(),
+        # otherwise queue the search to periodically check results and write them to the db
+        _logger.info(f"Scheduling polling for new search! {search_spec}")
+        plugin = search_spec.plugin
+        self.poll_scheduler.add(
+            search_spec,
+            interval_seconds=plugin.polling_interval(search_spec.search_params),
+            domain=plugin.domain(search_spec.search_params),
         )
         self.search_spec_ref_count[search_spec.id] = 1
 
-    def remove_search(self, search_spec: SearchSpec) -> None:
+    def remove_search(
+        self, search_spec: SearchSpec, subscriber: ListingSubscriber | None = None
+    ) -> None:
+        if subscriber is not None:
+            self.subscribers[search_spec.id].remove(subscriber)
+            if not self.subscribers[search_spec.id]:
+                del self.subscribers[search_spec.id]
+
         self.search_spec_ref_count[search_spec.id] -= 1
         if self.search_spec_ref_count[search_spec.id] == 0:
-            # there are no more notifiers looking at this search, remove the monitoring job
+            # there are no more notifiers looking at this search, stop polling it
             _logger.debug(f"Removing search from monitor {search_spec}")
-            job = self.search_spec_job_mapping[search_spec.id]
-            self.scheduler.remove_job(job.id)
-            del self.search_spec_job_mapping[search_spec.id]
+            self.poll_scheduler.remove(search_spec.id)
             del self.search_spec_ref_count[search_spec.id]
-
-    async def get_listings(
-        self, search_spec: SearchSpec, after_time: datetime
-    ) -> Sequence[Listing]:
-        with Session() as session:
-            return get_listings_from_db(session, search_spec.id, after_time)
+            self.arrival_rates.pop(search_spec.id, None)
+
+    def publish(self, search_spec_id: int, listings: Sequence[Listing]) -> None:
+        """
+        Deliver newly saved listings for a search to its subscribers.
+        """
+        # a subscriber watching the same search more than once only needs the listings once
+        for subscriber in dict.fromkeys(self.subscribers.get(search_spec_id, [])):
+            try:
+                subscriber(search_spec_id, listings)
+            except Exception:
+                _logger.exception(f"Error delivering listings for search {search_spec_id}")
 
     async def poll_search(self, search_spec: SearchSpec) -> None:
         if settings.disable_search_polling:
             _logger.debug(f"Search polling is disabled, would poll search {search_spec}")
             return
 
-        with Session() as session:
-            after_time = datetime.utcnow().replace(tzinfo=ZoneInfo("UTC")) - timedelta(
+        async with AsyncSession() as session:
+            backdate_time = datetime.utcnow().replace(tzinfo=ZoneInfo("UTC")) - timedelta(
                 hours=settings.notifier_backdate_time_hours
             )
-            last_listing = get_last_listing_from_db(session, search_spec.id)
+            after_time = backdate_time
+            last_listing = await session.run_sync(get_last_listing_from_db, search_spec.id)
             if last_listing is not None:
                 # resume at the last listing time if it was more recent than the backdate time
                 after_time = max(last_listing.created_at, after_time)
                 _logger.debug(
                     f"Found recent listing at {last_listing.created_at}, resuming at {after_time}."
                 )
+            # recently saved listings are passed to the plugin so they aren't scraped again
+            seen_urls = await session.run_sync(
+                get_listing_urls_from_db, search_spec.id, backdate_time
+            )
+
+        # don't hold on to a database connection while scraping
+        listings = await self.__safe_poll_search(search_spec, after_time, seen_urls)
+        if listings is None:
+            return
 
-            listings = await self.__safe_poll_search(search_spec, after_time)
-            session.add_all(
-                Listing.from_base_listing(listing, search_spec.id) for listing in listings
+        async with AsyncSession() as session:
+            new_listings = await session.run_sync(add_listings_to_db, search_spec.id, listings)
+            await session.commit()
+        _logger.debug(
+            f"Found {len(listings)} since {after_time} ({len(new_listings)} not previously"
+            f" saved) for search_spec={search_spec}"
+        )
+        if new_listings:
+            self.publish(search_spec.id, new_listings)
+
+        if settings.adaptive_polling_enabled:
+            await self.__update_polling_interval(search_spec, len(new_listings))
+
+    async def __update_polling_interval(
+        self, search_spec: SearchSpec, num_new_listings: int
+    ) -> None:
+        """
+        Adjust the polling interval of a search based on how many new listings it has been finding.
+        """
+        now = datetime.utcnow().replace(tzinfo=ZoneInfo("UTC"))
+        arrival_rate = self.arrival_rates.get(search_spec.id)
+        if arrival_rate is None:
+            # seed the arrival rate from the listings already saved for this search
+            window = timedelta(hours=settings.adaptive_polling_window_hours)
+            async with AsyncSession() as session:
+                recent_listings = await session.run_sync(
+                    count_listings_in_db, search_spec.id, now - window
+                )
+            arrival_rate = ListingArrivalRate(
+                listings_per_second=recent_listings / window.total_seconds(), last_poll_time=now
             )
-            session.commit()
-            _logger.debug(f"Found {len(listings)} since {after_time} for search_spec={search_spec}")
+            self.arrival_rates[search_spec.id] = arrival_rate
+        else:
+            arrival_rate.update(num_new_listings, now)
+
+        interval = arrival_rate.polling_interval(
+            settings.adaptive_polling_target_listings_per_poll,
+            min_seconds=settings.adaptive_polling_min_interval_seconds,
+            max_seconds=settings.adaptive_polling_max_interval_seconds,
+        )
+        _logger.debug(
+            f"Estimated {arrival_rate.listings_per_second * 3600:.2f} new listings/hour, polling"
+            f" every {interval}s for search_spec={search_spec}"
+        )
+        self.poll_scheduler.set_interval(search_spec.id, interval)
 
     async def __safe_poll_search(
-        self, search_spec: SearchSpec, after_time: datetime
-    ) -> list[BaseListing]:
+        self, search_spec: SearchSpec, after_time: datetime, seen_urls: set[str]
+    ) -> list[BaseListing] | None:
         _logger.debug(f"Polling search {search_spec} since {after_time}")
         listings: list[BaseListing] | None = None
         try:
-            listings = await search_spec.plugin.get_listings(search_spec.search_params, after_time)
+            listings = await search_spec.plugin.get_listings(
+                search_spec.search_params, after_time, seen_urls=seen_urls
+            )
         except Exception as e:
             _logger.exception(f"Error polling search {search_spec}")
             save_poll_failure_report(e)
 
         await self.__write_poll_execution_metric(search_spec.plugin_path, listings is not None)
-        return listings or []
+        return listings
 
     async def __write_poll_execution_metric(self, plugin_path: str, success: bool) -> None:
         labels = {"success": str(success).lower(), "plugin": plugin_path}
         write_metric(METRIC_POLL_JOB_EXECUTION_COUNT, 1, labels)
 
     def __del__(self) -> None:
-        for search_spec in self.search_spec_job_mapping:
-            job = self.search_spec_job_mapping[search_spec]
-            self.scheduler.remove_job(job.id)
+        self.poll_scheduler.shutdown()
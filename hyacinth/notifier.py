@@ -4,26 +4,31 @@ import asyncio
 import json
 import logging
 from abc import ABC, abstractmethod
+from collections import defaultdict
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import TYPE_CHECKING, Any
+from typing import TYPE_CHECKING, Any, Sequence
 
 from apscheduler.triggers.interval import IntervalTrigger
+from sqlalchemy.exc import SQLAlchemyError
 from zoneinfo import ZoneInfo
 
 from hyacinth import filters
 from hyacinth.db.crud.filter import add_filter
-from hyacinth.db.crud.notifier import save_notifier_state
+from hyacinth.db.crud.listing import get_first_new_listing_times, get_new_listings
+from hyacinth.db.crud.notifier import NotifierStateValues
 from hyacinth.db.crud.notifier_search import add_notifier_search
 from hyacinth.db.crud.search_spec import add_search_spec
 from hyacinth.db.models import Filter, Listing, NotifierSearch
-from hyacinth.db.session import Session
+from hyacinth.db.session import AsyncSession, Session
 from hyacinth.enums import RuleType
 from hyacinth.models import ListingMetadata
 from hyacinth.monitor import SearchMonitor
 from hyacinth.plugin import Plugin
 from hyacinth.scheduler import get_async_scheduler
 from hyacinth.settings import get_settings
+from hyacinth.state_store import get_state_store
+from hyacinth.util.cache import TTLCache
 
 if TYPE_CHECKING:
     from discord.abc import MessageableChannel
@@ -31,6 +36,27 @@ if TYPE_CHECKING:
 settings = get_settings()
 _logger = logging.getLogger(__name__)
 
+# listing content cache key -> decoded listing JSON, shared between all notifiers and searches
+_decoded_listing_cache: TTLCache[tuple[int, int], dict[str, Any]] = TTLCache(
+    maxsize=settings.decoded_listing_cache_size,
+    ttl_seconds=settings.decoded_listing_cache_ttl_seconds,
+)
+
+
+def decode_listing(listing: Listing) -> dict[str, Any]:
+    """
+    Get the decoded JSON of a saved listing, parsing it only if it is not already cached.
+    """
+    cache_key = listing.content_cache_key
+    if cache_key is None:
+        return json.loads(listing.listing_json)
+
+    decoded_listing = _decoded_listing_cache.get(cache_key)
+    if decoded_listing is None:
+        decoded_listing = json.loads(listing.listing_json)
+        _decoded_listing_cache.put(cache_key, decoded_listing)
+    return decoded_listing
+
 
 class ListingNotifier(ABC):
     @dataclass
@@ -45,6 +71,13 @@ class ListingNotifier(ABC):
     def __init__(self, monitor: SearchMonitor, config: ListingNotifier.Config) -> None:
         self.monitor = monitor
         self.config = config
+        self.compiled_filters = filters.compile_filters(self.config.filters)
+
+        # listings pushed by the monitor since the last notification run, by SearchSpec id
+        self.pending_listings: dict[int, list[Listing]] = defaultdict(list)
+        # listings saved while the notifier was not subscribed (e.g. before a restart) are only
+        # found by querying the database, so do that on the first run
+        self.needs_catch_up = True
 
         self.scheduler = get_async_scheduler()
         self.notify_job = self.scheduler.add_job(
@@ -56,7 +89,7 @@ class ListingNotifier(ABC):
             self.scheduler.pause_job(self.notify_job.id)
 
         for search in config.active_searches:
-            self.monitor.register_search(search.search_spec)
+            self.monitor.register_search(search.search_spec, self.on_new_listings)
 
         _logger.debug(
             "Successfully initialized notifier! Notifier state is:"
@@ -86,17 +119,20 @@ class ListingNotifier(ABC):
             # commit changes to the database
             session.commit()
 
-        self.monitor.register_search(search_spec)
+        # the new search may already have listings saved by another notifier watching it
+        self.needs_catch_up = True
+        self.monitor.register_search(search_spec, self.on_new_listings)
 
     def remove_search(self, search: NotifierSearch) -> None:
         self.config.active_searches.remove(search)
-        self.monitor.remove_search(search.search_spec)
+        self.monitor.remove_search(search.search_spec, self.on_new_listings)
 
         with Session() as session:
             session.delete(search)
             session.commit()
 
     def update_search(self, search: NotifierSearch, new_search_params: dict[str, Any]) -> None:
+        old_search_spec = search.search_spec
         with Session(expire_on_commit=False) as session:
             new_search_spec = add_search_spec(
                 session, search.search_spec.plugin_path, new_search_params
@@ -107,8 +143,9 @@ class ListingNotifier(ABC):
             session.merge(search)
             session.commit()
 
-        self.monitor.remove_search(search.search_spec)
-        self.monitor.register_search(new_search_spec)
+        self.needs_catch_up = True
+        self.monitor.remove_search(old_search_spec, self.on_new_listings)
+        self.monitor.register_search(new_search_spec, self.on_new_listings)
 
     def add_filter(self, field: str, rule_type: RuleType, rule_expr: str) -> None:
         if self.config.id is None:
@@ -119,6 +156,7 @@ class ListingNotifier(ABC):
             session.commit()
 
         self.config.filters.append(filter)
+        self.compiled_filters = filters.compile_filters(self.config.filters)
 
     def update_filter(self, filter: Filter, new_rule: str) -> None:
         with Session(expire_on_commit=False) as session:
@@ -127,23 +165,26 @@ class ListingNotifier(ABC):
             session.merge(filter)
             session.commit()
 
+        self.compiled_filters = filters.compile_filters(self.config.filters)
+
     def remove_filter(self, filter: Filter) -> None:
         with Session(expire_on_commit=False) as session:
             session.delete(filter)
             session.commit()
 
         self.config.filters.remove(filter)
+        self.compiled_filters = filters.compile_filters(self.config.filters)
 
     def set_paused(self, paused: bool) -> None:
         self.config.paused = paused
         if paused:
             self.scheduler.pause_job(self.notify_job.id)
         else:
+            # listings pushed while paused were dropped, so pick them up from the database
+            self.needs_catch_up = True
             self.scheduler.resume_job(self.notify_job.id)
 
-        with Session() as session:
-            save_notifier_state(session, self)
-            session.commit()
+        self._save_state()
 
     def set_notification_frequency(self, frequency_seconds: int) -> None:
         self.config.notification_frequency_seconds = frequency_seconds
@@ -151,63 +192,112 @@ class ListingNotifier(ABC):
             self.notify_job.id, trigger=IntervalTrigger(seconds=frequency_seconds)
         )
 
-        with Session() as session:
-            save_notifier_state(session, self)
-            session.commit()
+        self._save_state()
 
     def set_home_location(self, home_location: tuple[float, float] | None) -> None:
         self.config.home_location = home_location
 
-        with Session(expire_on_commit=False) as session:
-            save_notifier_state(session, self)
-            session.commit()
+        self._save_state()
 
-    def should_notify_listing(self, listing_metadata: ListingMetadata) -> bool:
-        """
-        Apply filters to the listing to see if we should notify the user.
-        """
-        listing: dict[str, Any] = json.loads(listing_metadata.listing.listing_json)
-        return filters.test(listing, self.config.filters)
+    def _save_state(self) -> None:
+        if self.config.id is None:
+            raise ValueError("Cannot save notifier state with no ID")
+
+        home_latitude, home_longitude = self.config.home_location or (None, None)
+        get_state_store().save_notifier_state(
+            self.config.id,
+            NotifierStateValues(
+                paused=self.config.paused,
+                notification_frequency_seconds=self.config.notification_frequency_seconds,
+                home_latitude=home_latitude,
+                home_longitude=home_longitude,
+            ),
+        )
 
-    async def _get_new_listings_for_search(self, search: NotifierSearch) -> list[ListingMetadata]:
+    def on_new_listings(self, search_spec_id: int, listings: Sequence[Listing]) -> None:
         """
-        Get new listings for a given search.
-
-        Updates the last_notified time for this search, so repeated calls will return only listings
-        that have not been seen before.
+        Receive listings which were just saved by the monitor and notify them as soon as possible.
         """
-        new_listings = await self.monitor.get_listings(
-            search.search_spec, after_time=search.last_notified
-        )
-        if new_listings:
-            search.last_notified = new_listings[0].created_at
-            _logger.debug(f"Most recent listing was found at {search.last_notified}")
+        if self.config.paused:
+            return
+        if self.needs_catch_up:
+            # the listings are already saved, so the next run will find them in the database
+            return
 
-        # save reference to plugin to format message later
-        listing_metadata: list[ListingMetadata] = [
-            ListingMetadata(listing=listing, plugin=search.search_spec.plugin)
-            for listing in new_listings
-        ]
+        self.pending_listings[search_spec_id].extend(listings)
+        self.notify_job.modify(next_run_time=datetime.now())
 
-        return listing_metadata
+    def should_notify_listing(self, listing_metadata: ListingMetadata) -> bool:
+        """
+        Apply filters to the listing to see if we should notify the user.
+        """
+        listing = listing_metadata.listing
+        try:
+            return filters.test(
+                decode_listing(listing), self.compiled_filters, cache_key=listing.content_cache_key
+            )
+        except Exception:
+            # e.g. a field the filters apply to is missing, which should not hold up other listings
+            _logger.exception(f"Error applying filters to listing {listing.id}, skipping it")
+            return False
 
     async def _get_new_listings(self) -> list[ListingMetadata]:
         """
-        Collect all new listings from all active searches
+        Collect all new listings from all active searches.
+
+        Updates the last_notified time for each search, so repeated calls will return only listings
+        that have not been seen before. Listings which do not pass the notifier's filters are left
+        out. Normally these are the listings pushed by the monitor since
+        the last call, but after a restart or change of searches they are queried from the
+        database instead.
         """
+        # (creation_time, created_at) of the earliest new listing by SearchSpec id and
+        # last_notified time, if it may not be among the returned listings
+        first_new_listing_times: dict[tuple[int, datetime], tuple[datetime, datetime]] | None = None
+        if self.needs_catch_up:
+            listings_by_search_spec, first_new_listing_times = await self._get_listings_from_db()
+        else:
+            listings_by_search_spec = self.pending_listings
+            self.pending_listings = defaultdict(list)
+            for pending in listings_by_search_spec.values():
+                pending.sort(key=lambda listing: listing.creation_time)
+
         listings: list[ListingMetadata] = []
+        last_notified: dict[int, datetime] = {}
         for search in self.config.active_searches:
-            listings.extend(await self._get_new_listings_for_search(search))
-        if listings:
-            # persist last_notified times to the database
-            _logger.debug(
-                f"Updating last_notified times for {len(self.config.active_searches)} active"
-                " searches"
-            )
-            with Session() as session:
-                for search in self.config.active_searches:
-                    session.merge(search)
-                session.commit()
+            search_listings = [
+                listing
+                for listing in listings_by_search_spec.get(search.search_spec_id, [])
+                if listing.creation_time > search.last_notified
+            ]
+
+            if first_new_listing_times is not None:
+                first_new_listing = first_new_listing_times.get(
+                    (search.search_spec_id, search.last_notified)
+                )
+            elif search_listings:
+                first_new_listing = (
+                    search_listings[0].creation_time,
+                    search_listings[0].created_at,
+                )
+            else:
+                first_new_listing = None
+            if first_new_listing is None or first_new_listing[0] <= search.last_notified:
+                continue
+
+            search.last_notified = first_new_listing[1]
+            last_notified[search.id] = search.last_notified
+            _logger.debug(f"Most recent listing was found at {search.last_notified}")
+
+            # save reference to plugin to format message later
+            search_listing_metadata = [
+                ListingMetadata(listing=listing, plugin=search.search_spec.plugin)
+                for listing in search_listings
+            ]
+            listings.extend(filter(self.should_notify_listing, search_listing_metadata))
+
+        # last_notified times are persisted to the database in the background
+        get_state_store().save_last_notified(last_notified)
 
         _logger.debug(
             f"Found {len(listings)} to notify for across {len(self.config.active_searches)} active"
@@ -216,6 +306,78 @@ class ListingNotifier(ABC):
         listings.sort(key=lambda lm: lm.listing.updated_at)
         return listings
 
+    async def _get_listings_from_db(
+        self,
+    ) -> tuple[dict[int, list[Listing]], dict[tuple[int, datetime], tuple[datetime, datetime]]]:
+        """
+        Catch up on listings which were saved while the notifier was not receiving them.
+
+        Listings for every search are fetched together, by SearchSpec id, a page at a time. As far
+        as possible, the notifier's filters are applied in the query so that listings which would be
+        filtered out are not loaded. Since the earliest new listing of a search may have been
+        filtered out, its times are fetched separately for each search to advance last_notified.
+        """
+        # cleared first, so that catching up again is not missed if it is requested while the
+        # queries are running
+        self.needs_catch_up = False
+        try:
+            return await self._query_listings_from_db()
+        except (SQLAlchemyError, OSError):
+            # try again on the next run, so listings saved while disconnected are not lost. Pushed
+            # listings will be found by that run too, so are not kept until then.
+            self.needs_catch_up = True
+            self.pending_listings = defaultdict(list)
+            raise
+
+    async def _query_listings_from_db(
+        self,
+    ) -> tuple[dict[int, list[Listing]], dict[tuple[int, datetime], tuple[datetime, datetime]]]:
+        # searches for the same SearchSpec share a query, starting from the earliest of them
+        after_times: dict[int, datetime] = {}
+        for search in self.config.active_searches:
+            after_time = after_times.get(search.search_spec_id, search.last_notified)
+            after_times[search.search_spec_id] = min(after_time, search.last_notified)
+
+        sql_filters = {
+            search.search_spec_id: filters.to_sql_predicate(
+                self.compiled_filters, search.search_spec.plugin.listing_cls
+            )
+            for search in self.config.active_searches
+        }
+
+        listings_by_search_spec: dict[int, list[Listing]] = defaultdict(list)
+        new_listing_ids: set[int] = set()
+        batch_size = settings.notifier_catch_up_batch_size
+        after_listing: tuple[datetime, int] | None = None
+        async with AsyncSession() as session:
+            while True:
+                page = await session.run_sync(
+                    get_new_listings, after_times, sql_filters, after_listing, batch_size
+                )
+                for listing in page:
+                    new_listing_ids.add(listing.id)
+                    listings_by_search_spec[listing.search_spec_id].append(listing)
+
+                if len(page) < batch_size:
+                    break
+                after_listing = (page[-1].creation_time, page[-1].id)
+
+            first_new_listing_times = await session.run_sync(
+                get_first_new_listing_times,
+                [
+                    (search.search_spec_id, search.last_notified)
+                    for search in self.config.active_searches
+                ],
+            )
+
+        # listings pushed while the query was running may already be part of its results
+        for search_spec_id, pending in self.pending_listings.items():
+            self.pending_listings[search_spec_id] = [
+                listing for listing in pending if listing.id not in new_listing_ids
+            ]
+
+        return listings_by_search_spec, first_new_listing_times
+
     async def _notify_new_listings(self) -> None:
         _logger.debug("Running notifier for new listings!")
         not_yet_notified_listings: list[ListingMetadata] = []
@@ -224,14 +386,6 @@ class ListingNotifier(ABC):
             if not listings:
                 return
 
-            # apply filters
-            unfiltered_listings_length = len(listings)
-            listings = list(filter(self.should_notify_listing, listings))
-            _logger.debug(
-                f"Filtered out {unfiltered_listings_length - len(listings)} listings. Notifying"
-                f" user of remaining {len(listings)} listings."
-            )
-
             not_yet_notified_listings = listings.copy()
             for listing in listings:
                 await self.notify(listing.plugin, listing.listing)
@@ -252,7 +406,7 @@ class ListingNotifier(ABC):
         _logger.debug("Cleaning up notifier!")
         self.scheduler.remove_job(self.notify_job.id)
         for search in self.config.active_searches:
-            self.monitor.remove_search(search.search_spec)
+            self.monitor.remove_search(search.search_spec, self.on_new_listings)
 
     @abstractmethod
     async def notify(self, plugin: Plugin, listing: Listing) -> None:
@@ -275,6 +429,6 @@ class ChannelNotifier(ListingNotifier):
         self.channel = channel
 
     async def notify(self, plugin: Plugin, listing: Listing) -> None:
-        parsed_listing = plugin.listing_cls.model_validate_json(listing.listing_json)
+        parsed_listing = plugin.listing_cls.model_validate(decode_listing(listing))
         message = plugin.format_listing(self, parsed_listing)
         await self.channel.send(**message.model_dump())
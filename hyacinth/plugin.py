@@ -3,7 +3,16 @@ from __future__ import annotations
 import importlib
 from abc import ABC, abstractmethod
 from datetime import datetime
-from typing import TYPE_CHECKING, Awaitable, Callable, Generic, Type, TypeVar, get_args
+from typing import (
+    TYPE_CHECKING,
+    Awaitable,
+    Callable,
+    Container,
+    Generic,
+    Type,
+    TypeVar,
+    get_args,
+)
 
 import discord
 
@@ -64,11 +73,28 @@ class Plugin(ABC, Generic[SearchParamsType, ListingType]):
     def polling_interval(self, search_params: SearchParamsType) -> int:
         """Recommended polling interval in seconds"""
 
+    def domain(self, search_params: SearchParamsType) -> str:
+        """
+        Domain scraped when polling a search.
+
+        Searches against the same domain share a concurrency budget when polling.
+        """
+        return self.path
+
     @abstractmethod
     async def get_listings(
-        self, search_params: SearchParamsType, after_time: datetime, limit: int | None = None
+        self,
+        search_params: SearchParamsType,
+        after_time: datetime,
+        limit: int | None = None,
+        seen_urls: Container[str] = frozenset(),
     ) -> list[ListingType]:
-        pass
+        """
+        Get listings created after the given time.
+
+        Listings with a URL in seen_urls have already been saved, and plugins should avoid
+        fetching them again where possible.
+        """
 
     @abstractmethod
     def format_listing(self, notifier: ChannelNotifier, listing: ListingType) -> DiscordMessage:
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from apscheduler.triggers.interval import IntervalTrigger
+
+from hyacinth.db.models import SearchSpec
+from hyacinth.metrics import METRIC_POLL_QUEUE_DEPTH, METRIC_POLL_QUEUE_WAIT_SECONDS, write_metric
+from hyacinth.scheduler import get_async_scheduler
+from hyacinth.settings import get_settings
+
+settings = get_settings()
+_logger = logging.getLogger(__name__)
+
+# how often the queue is checked for searches which are due to be polled
+DISPATCH_INTERVAL_SECONDS = 1
+
+
+@dataclass(eq=False)
+class PollJob:
+    search_spec: SearchSpec
+    interval_seconds: float
+    domain: str
+    due_time: float  # time.monotonic() timestamp
+
+
+class PollScheduler:
+    """
+    Schedules polls for every registered search from a single priority queue of due times.
+
+    Rather than firing an independent job for each search, due searches are dispatched from the
+    queue subject to a global concurrency limit and a per-domain concurrency limit. Searches which
+    are due while their budget is exhausted stay at the front of the queue until a slot frees up.
+    Initial and subsequent due times are jittered so that searches registered at the same time
+    (e.g. on start-up) do not all poll at once.
+    """
+
+    def __init__(
+        self,
+        poll: Callable[[SearchSpec], Awaitable[None]],
+        max_concurrency: int = settings.poll_max_concurrency,
+        max_concurrency_per_domain: int = settings.poll_max_concurrency_per_domain,
+        jitter_seconds: float = settings.poll_jitter_seconds,
+    ) -> None:
+        self.poll = poll
+        self.max_concurrency = max_concurrency
+        self.max_concurrency_per_domain = max_concurrency_per_domain
+        self.jitter_seconds = jitter_seconds
+
+        self.jobs: dict[int, PollJob] = {}  # SearchSpec id -> job
+        self._queue: list[tuple[float, int, PollJob]] = []  # (due time, tiebreaker, job)
+        self._counter = itertools.count()
+        self._running_by_domain: Counter[str] = Counter()
+        self._running_search_spec_ids: set[int] = set()
+        self._tasks: set[asyncio.Task[None]] = set()
+
+        self.scheduler = get_async_scheduler()
+        self.dispatch_job = self.scheduler.add_job(
+            self.dispatch, trigger=IntervalTrigger(seconds=DISPATCH_INTERVAL_SECONDS)
+        )
+
+    @property
+    def running(self) -> int:
+        return len(self._running_search_spec_ids)
+
+    def add(self, search_spec: SearchSpec, interval_seconds: float, domain: str) -> None:
+        if search_spec.id in self.jobs:
+            raise ValueError(f"Search {search_spec.id} is already scheduled")
+
+        due_time = time.monotonic() + random.uniform(0, min(self.jitter_seconds, interval_seconds))
+        job = PollJob(search_spec, interval_seconds, domain, due_time)
+        self.jobs[search_spec.id] = job
+        self._push(job)
+
+    def remove(self, search_spec_id: int) -> None:
+        # the job is lazily dropped from the queue the next time it comes up
+        del self.jobs[search_spec_id]
+
+    def set_interval(self, search_spec_id: int, interval_seconds: float) -> None:
+        """
+        Change the polling interval of a search.
+
+        If the search is being polled, its next poll is scheduled with the new interval as soon as
+        the current one finishes.
+        """
+        job = self.jobs.get(search_spec_id)
+        if job is None:
+            return  # removed while it was being polled
+
+        job.interval_seconds = interval_seconds
+
+    def shutdown(self) -> None:
+        self.scheduler.remove_job(self.dispatch_job.id)
+        for task in self._tasks:
+            task.cancel()
+        self.jobs.clear()
+        self._queue.clear()
+
+    async def dispatch(self) -> None:
+        """
+        Start polls for all due searches that fit within the concurrency budgets.
+        """
+        now = time.monotonic()
+        deferred: list[PollJob] = []
+        while self._queue and self._queue[0][0] <= now:
+            _, _, job = heapq.heappop(self._queue)
+            if self.jobs.get(job.search_spec.id) is not job:
+                continue  # removed since it was queued
+
+            if self.running >= self.max_concurrency:
+                self._push(job)
+                break
+            if (
+                self._running_by_domain[job.domain] >= self.max_concurrency_per_domain
+                or job.search_spec.id in self._running_search_spec_ids
+            ):
+                deferred.append(job)
+                continue
+
+            self._start(job, now)
+
+        for job in deferred:
+            self._push(job)
+
+        queue_depth = sum(
+            1
+            for due_time, _, job in self._queue
+            if due_time <= now and self.jobs.get(job.search_spec.id) is job
+        )
+        write_metric(METRIC_POLL_QUEUE_DEPTH, queue_depth)
+
+    def _start(self, job: PollJob, now: float) -> None:
+        write_metric(
+            METRIC_POLL_QUEUE_WAIT_SECONDS, round(now - job.due_time, 3), {"domain": job.domain}
+        )
+        self._running_by_domain[job.domain] += 1
+        self._running_search_spec_ids.add(job.search_spec.id)
+
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, job: PollJob) -> None:
+        try:
+            await self.poll(job.search_spec)
+        except Exception:
+            _logger.exception(f"Error running poll job for search {job.search_spec}")
+        finally:
+            self._running_by_domain[job.domain] -= 1
+            self._running_search_spec_ids.discard(job.search_spec.id)
+
+            if self.jobs.get(job.search_spec.id) is job:
+                jitter = random.uniform(-self.jitter_seconds, self.jitter_seconds) / 2
+                # don't try to make up for missed polls if we have fallen behind schedule
+                job.due_time = max(job.due_time + job.interval_seconds + jitter, time.monotonic())
+                self._push(job)
+
+    def _push(self, job: PollJob) -> None:
+        heapq.heappush(self._queue, (job.due_time, next(self._counter), job))
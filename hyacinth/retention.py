@@ -0,0 +1,117 @@
+import gzip
+import json
+import logging
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Sequence
+
+from apscheduler.triggers.interval import IntervalTrigger
+from zoneinfo import ZoneInfo
+
+from hyacinth.db.crud.listing import (
+    delete_listings,
+    delete_listings_before,
+    delete_unreferenced_listing_contents,
+    get_listings_before,
+)
+from hyacinth.db.models import Listing
+from hyacinth.db.session import Session
+from hyacinth.scheduler import get_threadpool_scheduler
+from hyacinth.settings import get_settings
+
+settings = get_settings()
+_logger = logging.getLogger(__name__)
+
+
+def start_listing_retention_task() -> None:
+    if not settings.listing_retention_enabled:
+        _logger.info("Listing retention disabled, will not start listing retention task")
+        return
+    scheduler = get_threadpool_scheduler()
+    scheduler.add_job(
+        delete_expired_listings,
+        trigger=IntervalTrigger(minutes=settings.listing_retention_interval_minutes),
+    )
+    _logger.info("Scheduled listing retention task")
+
+
+def delete_expired_listings() -> None:
+    """
+    Delete listings older than the retention period, archiving them first if configured.
+
+    Listings of searches which no notifier is watching are deleted as soon as they are too old to
+    be backdated to a new notifier, since they will not be notified about again. Listing content
+    which is no longer shared with any remaining listing is deleted along with them.
+    """
+    now = datetime.utcnow().replace(tzinfo=ZoneInfo("UTC"))
+    num_unwatched = _delete_listings_before(
+        now - timedelta(hours=settings.notifier_backdate_time_hours), unwatched_only=True
+    )
+    num_expired = _delete_listings_before(now - timedelta(days=settings.listing_retention_days))
+    num_contents = _delete_unreferenced_listing_contents()
+    _logger.info(
+        f"Deleted {num_expired} listings older than {settings.listing_retention_days} days,"
+        f" {num_unwatched} listings of unwatched searches and {num_contents} unused listing contents"
+    )
+
+
+def _delete_listings_before(before: datetime, unwatched_only: bool = False) -> int:
+    # delete in batches, so that the job never holds long-running locks on the listing table
+    num_deleted = 0
+    while True:
+        with Session() as session:
+            if settings.listing_archive_folder is not None:
+                # listings are only loaded in full when they need archiving
+                listings = get_listings_before(
+                    session, before, settings.listing_retention_batch_size, unwatched_only
+                )
+                if listings:
+                    # archived before deleting, so listings are not lost if archiving fails
+                    archive_listings(listings, Path(settings.listing_archive_folder))
+                    delete_listings(session, [listing.id for listing in listings])
+                num_batch_deleted = len(listings)
+            else:
+                num_batch_deleted = len(
+                    delete_listings_before(
+                        session, before, settings.listing_retention_batch_size, unwatched_only
+                    )
+                )
+            session.commit()
+
+        num_deleted += num_batch_deleted
+        if num_batch_deleted < settings.listing_retention_batch_size:
+            return num_deleted
+
+
+def _delete_unreferenced_listing_contents() -> int:
+    num_deleted = 0
+    while True:
+        with Session() as session:
+            num_batch_deleted = delete_unreferenced_listing_contents(
+                session, settings.listing_retention_batch_size
+            )
+            session.commit()
+
+        num_deleted += num_batch_deleted
+        if num_batch_deleted < settings.listing_retention_batch_size:
+            return num_deleted
+
+
+def archive_listings(listings: Sequence[Listing], folder: Path) -> None:
+    """
+    Append listings to the day's gzipped JSON lines archive in the given folder.
+    """
+    fname = folder / f"listings_{datetime.now().date().isoformat()}.jsonl.gz"
+    fname.parent.mkdir(parents=True, exist_ok=True)
+    with gzip.open(fname, "at", encoding="utf-8") as f:
+        for listing in listings:
+            row = {
+                "id": listing.id,
+                "search_spec_id": listing.search_spec_id,
+                "url": listing.url,
+                "creation_time": listing.creation_time.isoformat(),
+                "created_at": listing.created_at.isoformat(),
+                "listing": json.loads(listing.listing_json),
+            }
+            f.write(json.dumps(row) + "\n")
+    _logger.debug(f"Archived {len(listings)} listings to {fname}")
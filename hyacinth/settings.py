@@ -40,6 +40,11 @@ class Settings(BaseSettings):
     # db credentials
     postgres_user: str = Field(alias="POSTGRES_USER")
     postgres_password: str = Field(alias="POSTGRES_PASSWORD")
+    # connection pool sizing, for each of the sync and async engines
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    # test connections before use, so that connections dropped by the database are replaced
+    db_pool_pre_ping: bool = True
 
     # the local geocoding implementation does not require a google API key, but requires first
     # downloading some spatial data and only supports the US
@@ -52,6 +57,40 @@ class Settings(BaseSettings):
     craigslist_poll_interval_seconds: int = 600
     marketplace_poll_interval_seconds: int = 600
 
+    # when enabled, poll intervals adapt to how often new listings are found for each search, so
+    # busy searches are polled more often than quiet ones (within the configured bounds)
+    adaptive_polling_enabled: bool = False
+    adaptive_polling_min_interval_seconds: int = 120
+    adaptive_polling_max_interval_seconds: int = 3600
+    # adaptive intervals aim to find roughly this many new listings per poll
+    adaptive_polling_target_listings_per_poll: float = 5
+    # initial listing arrival rates are estimated from listings found within this window
+    adaptive_polling_window_hours: int = 24
+
+    # limits on how many searches may be polled at once, across all sources and per source domain
+    poll_max_concurrency: int = 8
+    poll_max_concurrency_per_domain: int = 4
+    # poll times are randomly offset by up to this much to avoid polling many searches at once
+    poll_jitter_seconds: int = 60
+
+    # maximum number of listing detail pages fetched in parallel during a single search
+    craigslist_max_concurrent_detail_pages: int = 4
+
+    # index listing titles for keyword searches using the pg_trgm extension, which must be available
+    # to the database user
+    listing_title_trigram_index_enabled: bool = False
+
+    # if enabled, listings are permanently deleted once they are older than the retention period.
+    # Listings of searches which no notifier is watching are deleted sooner, once they are older than
+    # the notifier backdate time. Disabled by default, so that upgrading never deletes listings.
+    listing_retention_enabled: bool = False
+    listing_retention_days: int = 30
+    listing_retention_interval_minutes: int = 60
+    # listings are deleted in batches of this size, each in its own transaction
+    listing_retention_batch_size: int = 1000
+    # if set, deleted listings are archived to this folder as gzipped JSON lines
+    listing_archive_folder: str | None = None
+
     discord_token: str
 
     # immediately send notifications for listings this far in the past after creating a new notifier
@@ -59,6 +98,21 @@ class Settings(BaseSettings):
 
     # how often to check the database for new listings to notify each channel about
     notification_frequency_seconds: int = 60
+    # when catching up on listings saved while a notifier was paused or offline, listings are
+    # loaded from the database and filtered in batches of this size
+    notifier_catch_up_batch_size: int = 500
+    # changes to notifier settings and last notified times are saved to the database in batches at
+    # this interval
+    notifier_state_flush_interval_seconds: int = 5
+
+    # decoded listings are cached and shared between notifiers, so that listings for a search
+    # watched by many channels are only parsed once
+    decoded_listing_cache_size: int = 10000
+    decoded_listing_cache_ttl_seconds: int = 3600
+    # likewise, filter results are cached so that notifiers with the same filter rules only
+    # evaluate them once per listing
+    filter_result_cache_size: int = 50000
+    filter_result_cache_ttl_seconds: int = 3600
 
     # for some sources, thumbnails may be mirrored to s3 before display
     # this is to account for some websites blocking discord from loading the image preview in the
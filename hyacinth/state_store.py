@@ -0,0 +1,72 @@
+import logging
+from datetime import datetime
+from functools import cache
+from threading import Lock
+from typing import Mapping
+
+from apscheduler.triggers.interval import IntervalTrigger
+
+from hyacinth.db.crud.notifier import NotifierStateValues, update_notifier_states
+from hyacinth.db.crud.notifier_search import update_last_notified
+from hyacinth.db.session import Session
+from hyacinth.scheduler import get_threadpool_scheduler
+from hyacinth.settings import get_settings
+
+settings = get_settings()
+_logger = logging.getLogger(__name__)
+
+
+class NotifierStateStore:
+    """
+    Write-behind store for notifier settings and NotifierSearch last_notified times.
+
+    Changes are collected in memory, with later changes to the same notifier or search replacing
+    earlier ones, and written to the database together by flush. Flushing runs on a short interval
+    and on shutdown, so at most one interval of changes can be lost if the bot crashes.
+    """
+
+    def __init__(self) -> None:
+        self._lock = Lock()
+        self._notifier_states: dict[int, NotifierStateValues] = {}  # notifier id -> settings
+        self._last_notified: dict[int, datetime] = {}  # NotifierSearch id -> last_notified
+
+    def save_notifier_state(self, notifier_id: int, values: NotifierStateValues) -> None:
+        with self._lock:
+            self._notifier_states[notifier_id] = values
+
+    def save_last_notified(self, last_notified: Mapping[int, datetime]) -> None:
+        with self._lock:
+            self._last_notified.update(last_notified)
+
+    def flush(self) -> None:
+        with self._lock:
+            notifier_states, self._notifier_states = self._notifier_states, {}
+            last_notified, self._last_notified = self._last_notified, {}
+        if not notifier_states and not last_notified:
+            return
+
+        try:
+            with Session() as session:
+                update_notifier_states(session, notifier_states)
+                update_last_notified(session, last_notified)
+                session.commit()
+        except Exception:
+            # retry on the next flush, unless the changes have been superseded in the meantime
+            with self._lock:
+                self._notifier_states = notifier_states | self._notifier_states
+                self._last_notified = last_notified | self._last_notified
+            raise
+
+
+@cache
+def get_state_store() -> NotifierStateStore:
+    return NotifierStateStore()
+
+
+def start_state_flush_task() -> None:
+    scheduler = get_threadpool_scheduler()
+    scheduler.add_job(
+        get_state_store().flush,
+        trigger=IntervalTrigger(seconds=settings.notifier_state_flush_interval_seconds),
+    )
+    _logger.info("Scheduled notifier state flush task")
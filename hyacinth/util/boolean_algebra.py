@@ -1,5 +1,9 @@
 from __future__ import annotations
 
+import re
+from functools import cached_property, lru_cache
+from typing import Any, Callable, Container, Iterator
+
 from boolean import (
     TOKEN_AND,
     TOKEN_FALSE,
@@ -16,6 +20,34 @@ from boolean import (
 )
 
 
+# maximum number of distinct rule strings to keep parsed
+PARSED_EXPRESSION_CACHE_SIZE = 1024
+
+# mapping of lowercase token strings to a token type id for the standard operators, parens and
+# common true or false symbols, as used in the default tokenizer implementation. Token strings which
+# are not in this mapping exactly are words, and runs of words are merged into a single symbol.
+_TOKENS = {
+    "*": TOKEN_AND,
+    "&": TOKEN_AND,
+    "and": TOKEN_AND,
+    "AND": TOKEN_AND,
+    "+": TOKEN_OR,
+    "|": TOKEN_OR,
+    "or": TOKEN_OR,
+    "OR": TOKEN_OR,
+    "~": TOKEN_NOT,
+    "!": TOKEN_NOT,
+    "not": TOKEN_NOT,
+    "(": TOKEN_LPAR,
+    ")": TOKEN_RPAR,
+    "[": TOKEN_LPAR,
+    "]": TOKEN_RPAR,
+    "true": TOKEN_TRUE,
+    "false": TOKEN_FALSE,
+    "none": TOKEN_FALSE,
+}
+
+
 class BooleanRuleAlgebra(BooleanAlgebra):
     """
     Subclass of BooleanAlgebra to be used with filter rules.
@@ -67,82 +99,62 @@ class BooleanRuleAlgebra(BooleanAlgebra):
         if not isinstance(expr, str):
             raise TypeError(f"expr must be string but it is {type(expr)}.")
 
-        # mapping of lowercase token strings to a token type id for the standard
-        # operators, parens and common true or false symbols, as used in the
-        # default tokenizer implementation.
-        TOKENS = {
-            "*": TOKEN_AND,
-            "&": TOKEN_AND,
-            "and": TOKEN_AND,
-            "AND": TOKEN_AND,
-            "+": TOKEN_OR,
-            "|": TOKEN_OR,
-            "or": TOKEN_OR,
-            "OR": TOKEN_OR,
-            "~": TOKEN_NOT,
-            "!": TOKEN_NOT,
-            "not": TOKEN_NOT,
-            "(": TOKEN_LPAR,
-            ")": TOKEN_RPAR,
-            "[": TOKEN_LPAR,
-            "]": TOKEN_RPAR,
-            "true": TOKEN_TRUE,
-            "false": TOKEN_FALSE,
-            "none": TOKEN_FALSE,
-        }
-        tokens = []
-
-        position = 0
-        length = len(expr)
-
-        while position < length:
-            tok = expr[position]
-
-            sym = tok.isalnum() or tok == "_"
-            if sym:
-                position += 1
-                while position < length:
-                    char = expr[position]
-                    if char.isalnum() or char in self.allowed_in_token:
-                        position += 1
-                        tok += char
-                    else:
-                        break
-                position -= 1
-
-            try:
-                tokens.append((TOKENS[tok.lower()], tok, position))
-            except KeyError as e:
-                if sym:
-                    tokens.append((TOKEN_SYMBOL, tok, position))
-                elif tok not in (" ", "\t", "\r", "\n"):
-                    raise ParseError(
-                        token_string=tok, position=position, error_code=boolean.PARSE_UNKNOWN_TOKEN
-                    ) from e
-
-            position += 1
-
-        i = len(tokens) - 1
-        while i > 0:
-            if tokens[i][1] in TOKENS:
-                i -= 1
-                continue
-
-            pos = tokens[i][2]
-            new_token = ""
-            j = i - 1
-            while j >= 0 and tokens[j][1] not in TOKENS:
-                new_token = tokens[j + 1][1] + " " + new_token
-                tokens.pop(j + 1)
-                j -= 1
-            new_token = (tokens[j + 1][1] + " " + new_token)[:-1]
-            tokens.pop(j + 1)
-
-            tokens.insert(j + 1, (TOKEN_SYMBOL, new_token, pos))
-            i -= i - j
+        tokens: list[tuple[Any, str, int]] = []
+        # consecutive words which are not operators, merged into a single symbol once the run ends
+        words: list[tuple[Any, str, int]] = []
+
+        for token in self._scan(expr):
+            if token[1] in _TOKENS:
+                _append_words(tokens, words)
+                tokens.append(token)
+            else:
+                words.append(token)
+        _append_words(tokens, words)
 
         return tokens
 
+    def _scan(self, expr: str) -> Iterator[tuple[Any, str, int]]:
+        """
+        Split an expression into operators and single-word symbols.
+        """
+        for match in self._token_pattern.finditer(expr):
+            tok = match.group()
+            if match.lastgroup == "word":
+                # words are positioned at their last character
+                yield (_TOKENS.get(tok.lower(), TOKEN_SYMBOL), tok, match.end() - 1)
+            elif match.lastgroup == "char":
+                if tok not in _TOKENS:
+                    raise ParseError(
+                        token_string=tok,
+                        position=match.start(),
+                        error_code=boolean.PARSE_UNKNOWN_TOKEN,
+                    )
+                yield (_TOKENS[tok], tok, match.start())
+
+    @cached_property
+    def _token_pattern(self) -> re.Pattern[str]:
+        # a word starts with an alphanumeric character or underscore, followed by alphanumeric
+        # characters or characters allowed in tokens ([^\W_] matches exactly str.isalnum()), and
+        # any other character is a token on its own unless it is whitespace
+        allowed = "".join(re.escape(char) for char in self.allowed_in_token)
+        word = rf"\w(?:[^\W_]|[{allowed}])*" if allowed else r"\w[^\W_]*"
+        return re.compile(rf"(?P<word>{word})|[ \t\r\n]+|(?P<char>.)", re.DOTALL)
+
+
+def _append_words(tokens: list[tuple[Any, str, int]], words: list[tuple[Any, str, int]]) -> None:
+    """
+    Append a run of words to the tokens as a single symbol, positioned at its last word.
+    """
+    if not words:
+        return
+    if len(words) == 1 and not tokens:
+        # a single word at the start of the expression keeps its own token type, so e.g. "True"
+        # on its own is still parsed as true rather than as a symbol
+        tokens.append(words[0])
+    else:
+        tokens.append((TOKEN_SYMBOL, " ".join(word[1] for word in words), words[-1][2]))
+    words.clear()
+
 
 algebra = BooleanRuleAlgebra(allowed_in_token=(".", ":", "_", "-"))
 
@@ -157,5 +169,36 @@ def evaluate_expression(expression: Expression, text: str) -> bool:
     return bool(simplified_rule)
 
 
+def compile_expression(expression: Expression) -> Callable[[Container[str]], bool]:
+    """
+    Turn a parsed expression into a predicate which checks whether its symbols occur in a text.
+
+    The predicate gives the same result as evaluate_expression, but walks the expression tree
+    directly and short-circuits and/or instead of substituting every symbol and simplifying. It
+    can also be given the set of symbols already known to occur in the text, in which case each
+    symbol is a set lookup instead of a substring search.
+    """
+    if isinstance(expression, algebra.Symbol):
+        symbol = expression.obj
+        return lambda text: symbol in text
+    if expression == algebra.TRUE:
+        return lambda text: True
+    if expression == algebra.FALSE:
+        return lambda text: False
+
+    args = [compile_expression(arg) for arg in expression.args]
+    if isinstance(expression, algebra.NOT):
+        arg = args[0]
+        return lambda text: not arg(text)
+    if isinstance(expression, algebra.AND):
+        return lambda text: all(arg(text) for arg in args)
+    if isinstance(expression, algebra.OR):
+        return lambda text: any(arg(text) for arg in args)
+
+    raise ValueError(f"Unsupported expression: {expression!r}")
+
+
+# parsed expressions are immutable, so the same rule can be shared by every filter which uses it
+@lru_cache(maxsize=PARSED_EXPRESSION_CACHE_SIZE)
 def parse_expression(rule_str: str) -> Expression:
     return algebra.parse(rule_str)
@@ -0,0 +1,35 @@
+from typing import Iterable
+
+import ahocorasick
+
+# below this many keywords, checking for each keyword separately is faster than building and
+# running an automaton
+MIN_AUTOMATON_KEYWORDS = 16
+
+
+class KeywordMatcher:
+    """
+    Finds which of a set of keywords occur in a text.
+
+    For larger keyword sets, an Aho-Corasick automaton is used so that all keywords are found in a
+    single pass over the text, rather than scanning the text once per keyword.
+    """
+
+    def __init__(self, keywords: Iterable[str]) -> None:
+        self.keywords = frozenset(keywords)
+
+        self._automaton: ahocorasick.Automaton | None = None
+        if len(self.keywords) >= MIN_AUTOMATON_KEYWORDS:
+            self._automaton = ahocorasick.Automaton()
+            for keyword in self.keywords:
+                self._automaton.add_word(keyword, keyword)
+            self._automaton.make_automaton()
+
+    def match(self, text: str) -> set[str]:
+        """
+        Get the keywords which occur anywhere in the text.
+        """
+        if self._automaton is None:
+            return {keyword for keyword in self.keywords if keyword in text}
+
+        return {keyword for _, keyword in self._automaton.iter(text)}
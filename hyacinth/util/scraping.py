@@ -1,10 +1,17 @@
+from __future__ import annotations
+
+import asyncio
 import logging
 import typing
+from collections import deque
 from contextlib import asynccontextmanager
-from typing import AsyncIterator, Literal
+from functools import cache
+from types import TracebackType
+from typing import AsyncGenerator, AsyncIterator, Awaitable, Callable, Iterable, Literal, TypeVar
 from urllib.parse import urlparse
 
-from playwright.async_api import BrowserContext, Page, async_playwright
+from playwright.async_api import Browser, BrowserContext, Page, Playwright, async_playwright
+from playwright.async_api import Error as PlaywrightError
 
 from hyacinth.metrics import METRIC_SCRAPE_COUNT, write_metric
 from hyacinth.settings import get_settings
@@ -13,20 +20,186 @@ from hyacinth.util.save_pages import save_scraped_page
 settings = get_settings()
 _logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+BROWSERLESS_CDP_URL = "ws://browserless:3000?stealth&blockAds=true"
+
+
+class BrowserConnection:
+    """
+    A long-lived, process-wide connection to browserless.
+
+    Starting the playwright driver and opening the CDP websocket is comparatively expensive, so a
+    single connection is shared by all searches. Each caller gets its own fresh BrowserContext from
+    the shared browser. If the connection drops (e.g. browserless restarted or timed out the
+    session), it is transparently re-established the next time a context is requested.
+    """
+
+    def __init__(self, endpoint_url: str) -> None:
+        self.endpoint_url = endpoint_url
+        self._playwright: Playwright | None = None
+        self._browser: Browser | None = None
+        self._lock = asyncio.Lock()
+
+    @property
+    def is_connected(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def connect(self) -> Browser:
+        """
+        Return the shared browser, connecting (or reconnecting) first if necessary.
+        """
+        async with self._lock:
+            if self._browser is not None and self._browser.is_connected():
+                return self._browser
+
+            return await self._connect()
+
+    async def new_context(self) -> BrowserContext:
+        browser = await self.connect()
+        try:
+            return await browser.new_context()
+        except PlaywrightError:
+            # the connection may have gone stale without being reported as disconnected yet
+            _logger.warning("Error creating browser context, reconnecting", exc_info=True)
+            return await (await self._reconnect(browser)).new_context()
+
+    async def _reconnect(self, stale_browser: Browser) -> Browser:
+        async with self._lock:
+            # another caller which hit the same error may have reconnected while we waited
+            browser = self._browser
+            if browser is not None and browser is not stale_browser and browser.is_connected():
+                return browser
+
+            return await self._connect()
+
+    async def _connect(self) -> Browser:
+        await self._close()
+        _logger.info("Connecting to browserless")
+        self._playwright = await async_playwright().start()
+        self._browser = await self._playwright.chromium.connect_over_cdp(self.endpoint_url)
+        return self._browser
+
+    async def close(self) -> None:
+        async with self._lock:
+            await self._close()
+
+    async def _close(self) -> None:
+        browser, playwright = self._browser, self._playwright
+        self._browser, self._playwright = None, None
+        try:
+            if browser is not None:
+                await browser.close()
+        except PlaywrightError:
+            _logger.debug("Error closing browser connection", exc_info=True)
+        finally:
+            if playwright is not None:
+                await playwright.stop()
+
+
+@cache
+def get_browser_connection() -> BrowserConnection:
+    return BrowserConnection(BROWSERLESS_CDP_URL)
+
 
 @asynccontextmanager
 async def get_browser_context() -> AsyncIterator[BrowserContext]:
-    async with async_playwright() as playwright:
-        browser = await playwright.chromium.connect_over_cdp(
-            "ws://browserless:3000?stealth&blockAds=true"
-        )
-        context = await browser.new_context()
-        _patch_new_page(context)
-
+    context = await get_browser_connection().new_context()
+    _patch_new_page(context)
+
+    try:
+        yield context
+    finally:
+        await context.close()
+
+
+class PagePool:
+    """
+    A bounded pool of pages within a single browser context.
+
+    Pages are opened lazily, up to the pool size, and reused for the lifetime of the pool. Use
+    `map_ordered` to process many URLs in parallel while still consuming the results in order.
+    """
+
+    def __init__(self, browser_context: BrowserContext, size: int) -> None:
+        if size < 1:
+            raise ValueError("Page pool size must be at least 1")
+
+        self.browser_context = browser_context
+        self.size = size
+        self._pages: list[Page] = []
+        self._idle_pages: list[Page] = []
+        # held for as long as a page is borrowed, so that no more than size pages are ever opened
+        self._semaphore = asyncio.Semaphore(size)
+
+    async def __aenter__(self) -> PagePool:
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None,
+    ) -> None:
+        await self.close()
+
+    @asynccontextmanager
+    async def page(self) -> AsyncIterator[Page]:
+        """
+        Borrow a page from the pool, waiting for one to be returned if the pool is exhausted.
+        """
+        async with self._semaphore:
+            if self._idle_pages:
+                page = self._idle_pages.pop()
+            else:
+                page = await self.browser_context.new_page()
+                self._pages.append(page)
+
+            try:
+                yield page
+            finally:
+                self._idle_pages.append(page)
+
+    async def map_ordered(
+        self, items: Iterable[T], fn: Callable[[Page, T], Awaitable[R]]
+    ) -> AsyncGenerator[R, None]:
+        """
+        Apply fn to each item using up to `size` pages concurrently.
+
+        Results are yielded in the same order as the input items. At most `size` items are in
+        flight at once, so a consumer which stops iterating early wastes at most `size - 1` fetches.
+        """
+
+        async def run(item: T) -> R:
+            async with self.page() as page:
+                return await fn(page, item)
+
+        remaining = iter(items)
+        in_flight: deque[asyncio.Task[R]] = deque()
         try:
-            yield context
+            for item in remaining:
+                in_flight.append(asyncio.create_task(run(item)))
+                if len(in_flight) >= self.size:
+                    break
+
+            while in_flight:
+                result = await in_flight.popleft()
+                # keep the pool saturated while the consumer handles this result
+                for item in remaining:
+                    in_flight.append(asyncio.create_task(run(item)))
+                    break
+                yield result
         finally:
-            await context.close()
+            for task in in_flight:
+                task.cancel()
+            await asyncio.gather(*in_flight, return_exceptions=True)
+
+    async def close(self) -> None:
+        for page in self._pages:
+            await page.close()
+        self._pages.clear()
 
 
 def _patch_new_page(context: BrowserContext) -> None:
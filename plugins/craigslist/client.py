@@ -1,7 +1,8 @@
 import logging
 import re
+from contextlib import aclosing
 from datetime import datetime
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Container
 
 from bs4 import BeautifulSoup
 from playwright.async_api import Page
@@ -11,7 +12,7 @@ from hyacinth.exceptions import ParseError
 from hyacinth.settings import get_settings
 from hyacinth.util.geo import reverse_geotag
 from hyacinth.util.s3 import mirror_image
-from hyacinth.util.scraping import get_browser_context
+from hyacinth.util.scraping import PagePool, get_browser_context
 from plugins.craigslist.models import CraigslistListing, CraigslistSearchParams
 from plugins.craigslist.util import get_geotag_from_url
 
@@ -26,10 +27,13 @@ METRIC_CRAIGSLIST_PARSE_ERROR_COUNT = "craigslist_parse_error_count"
 
 
 async def get_listings(
-    search_params: CraigslistSearchParams, after_time: datetime, limit: int | None = None
+    search_params: CraigslistSearchParams,
+    after_time: datetime,
+    limit: int | None = None,
+    seen_urls: Container[str] = frozenset(),
 ) -> list[CraigslistListing]:
     listings = []
-    search = _search(search_params)
+    search = _search(search_params, seen_urls)
     async for listing in search:
         if listing.updated_time > after_time > listing.creation_time:
             _logger.debug(f"Skipping updated listing {listing.title}")
@@ -48,10 +52,12 @@ async def get_listings(
 
 
 async def _search(
-    search_params: CraigslistSearchParams,
+    search_params: CraigslistSearchParams, seen_urls: Container[str] = frozenset()
 ) -> AsyncGenerator[CraigslistListing, None]:
     page = 0
-    async with get_browser_context() as browser_context:
+    async with get_browser_context() as browser_context, PagePool(
+        browser_context, settings.craigslist_max_concurrent_detail_pages
+    ) as detail_pages:
         browser_page = await browser_context.new_page()
         while True:
             search_results_content = await _get_search_results_content(
@@ -59,11 +65,17 @@ async def _search(
             )
             has_next_page, parsed_search_results = _parse_search_results(search_results_content)
 
-            for result_url in parsed_search_results:
-                detail_content = await _get_detail_content(browser_page, result_url)
-                listing = _parse_result_details(result_url, detail_content)
-                await _enrich_listing(listing)
-                yield listing
+            # skip listings which have already been saved without visiting them
+            unseen_results = [url for url in parsed_search_results if url not in seen_urls]
+            if parsed_search_results and not unseen_results:
+                _logger.debug("All listings on this page have already been seen, stopping search")
+                break
+
+            # details are fetched in parallel, but yielded in search result order so that callers
+            # can stop early once they reach listings older than they are interested in
+            async with aclosing(detail_pages.map_ordered(unseen_results, _get_listing)) as listings:
+                async for listing in listings:
+                    yield listing
 
             if not has_next_page:
                 break
@@ -96,6 +108,16 @@ async def _get_search_results_content(
     return await browser_page.content()
 
 
+async def _get_listing(browser_page: Page, url: str) -> CraigslistListing:
+    """
+    Fetch, parse and enrich a single Craigslist listing.
+    """
+    detail_content = await _get_detail_content(browser_page, url)
+    listing = _parse_result_details(url, detail_content)
+    await _enrich_listing(listing)
+    return listing
+
+
 async def _get_detail_content(browser_page: Page, url: str) -> str:
     """
     Get the content of a Craigslist listing details page.
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import logging
 from datetime import datetime
-from typing import Awaitable, Callable
+from typing import Awaitable, Callable, Container
 
 import discord
 from discord.ui import Modal
@@ -32,10 +32,17 @@ class CraigslistPlugin(Plugin[CraigslistSearchParams, CraigslistListing]):
     def polling_interval(self, search_params: CraigslistSearchParams) -> int:
         return settings.craigslist_poll_interval_seconds
 
+    def domain(self, search_params: CraigslistSearchParams) -> str:
+        return "craigslist.org"
+
     async def get_listings(
-        self, search_params: CraigslistSearchParams, after_time: datetime, limit: int | None = None
+        self,
+        search_params: CraigslistSearchParams,
+        after_time: datetime,
+        limit: int | None = None,
+        seen_urls: Container[str] = frozenset(),
     ) -> list[CraigslistListing]:
-        return await get_listings(search_params, after_time, limit)
+        return await get_listings(search_params, after_time, limit, seen_urls)
 
     def format_listing(
         self, notifier: ChannelNotifier, listing: CraigslistListing
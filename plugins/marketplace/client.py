@@ -1,7 +1,7 @@
 import json
 import logging
 from datetime import datetime
-from typing import AsyncGenerator
+from typing import AsyncGenerator, Container
 
 from bs4 import BeautifulSoup
 from playwright.async_api import Page, TimeoutError
@@ -21,10 +21,13 @@ MARKETPLACE_SEARCH_URL = "https://www.facebook.com/marketplace/{location}/{categ
 
 
 async def get_listings(
-    search_params: MarketplaceSearchParams, after_time: datetime, limit: int | None = None
+    search_params: MarketplaceSearchParams,
+    after_time: datetime,
+    limit: int | None = None,
+    seen_urls: Container[str] = frozenset(),
 ) -> list[MarketplaceListing]:
     listings = []
-    search = _search(search_params)
+    search = _search(search_params, seen_urls)
     async for listing in search:
         if listing.creation_time <= after_time:
             await search.aclose()
@@ -40,7 +43,7 @@ async def get_listings(
 
 
 async def _search(
-    search_params: MarketplaceSearchParams,
+    search_params: MarketplaceSearchParams, seen_urls: Container[str] = frozenset()
 ) -> AsyncGenerator[MarketplaceListing, None]:
     async with get_browser_context() as browser_context:
         search_page = await browser_context.new_page()
@@ -49,6 +52,7 @@ async def _search(
         )
 
         num_results = 0
+        visited_urls: set[str] = set()
         while True:  # loop while there are new results (scrolling down loads more results)
             _logger.debug("Getting search results page content")
             search_content = await search_page.content()
@@ -58,9 +62,21 @@ async def _search(
                 break
             num_results = len(result_urls)
 
+            # previously loaded results are still on the page after scrolling, only visit new
+            # results which have not already been saved
+            new_result_urls = [
+                url
+                for url in dict.fromkeys(result_urls)
+                if url not in visited_urls and url not in seen_urls
+            ]
+            visited_urls.update(result_urls)
+            if not new_result_urls:
+                _logger.debug("All loaded results have already been seen, stopping search")
+                break
+
             result_page = await browser_context.new_page()
             try:
-                for url in result_urls:
+                for url in new_result_urls:
                     result_content = await _navigate_to_listing_and_get_content(result_page, url)
 
                     listing = _parse_result_details(url, result_content)
@@ -2,7 +2,7 @@ from __future__ import annotations
 
 import logging
 from datetime import datetime
-from typing import Awaitable, Callable
+from typing import Awaitable, Callable, Container
 
 import discord
 from discord.ui import Modal
@@ -32,10 +32,17 @@ class MarketplacePlugin(Plugin[MarketplaceSearchParams, MarketplaceListing]):
     def polling_interval(self, search_params: MarketplaceSearchParams) -> int:
         return settings.marketplace_poll_interval_seconds
 
+    def domain(self, search_params: MarketplaceSearchParams) -> str:
+        return "facebook.com"
+
     async def get_listings(
-        self, search_params: MarketplaceSearchParams, after_time: datetime, limit: int | None = None
+        self,
+        search_params: MarketplaceSearchParams,
+        after_time: datetime,
+        limit: int | None = None,
+        seen_urls: Container[str] = frozenset(),
     ) -> list[MarketplaceListing]:
-        return await get_listings(search_params, after_time, limit)
+        return await get_listings(search_params, after_time, limit, seen_urls)
 
     def format_listing(
         self, notifier: ChannelNotifier, listing: MarketplaceListing
@@ -1,13 +1,15 @@
-from typing import Any, Callable, Generator
+from typing import Any, AsyncGenerator, Callable, Generator
 from unittest.mock import Mock
 
 import pytest
 from discord import Message
 from pytest_mock import MockerFixture
 from sqlalchemy import StaticPool, create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.orm import Session, sessionmaker
 
 from hyacinth import plugin
+from hyacinth.db import session as db_session
 from hyacinth.db.models import Base
 from hyacinth.models import Location
 from hyacinth.plugin import register_plugin
@@ -33,6 +35,25 @@ def test_db_session(mocker: MockerFixture) -> Generator[sessionmaker[Session], N
     Base.metadata.drop_all(sqlite_engine)
 
 
+@pytest.fixture
+async def test_db_async_session() -> AsyncGenerator[async_sessionmaker[AsyncSession], None]:
+    """
+    Test fixture for binding the async postgres session to a clean async SQLite database.
+
+    The application's own session factory is used, so that its configuration is tested too. DB is
+    cleared after use.
+    """
+    async_engine = create_async_engine("sqlite+aiosqlite://", poolclass=StaticPool)
+    async with async_engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+    db_session.AsyncSession.configure(bind=async_engine)
+
+    yield db_session.AsyncSession
+
+    db_session.AsyncSession.configure(bind=None)
+    await async_engine.dispose()
+
+
 def make_message(content: str = "") -> Mock:
     message_mock = Mock(spec=Message)
     message_mock.content = content
@@ -1,9 +1,39 @@
 from datetime import datetime
 
+from pytest_mock import MockerFixture
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session, sessionmaker
 
-from hyacinth.db.crud.listing import get_last_listing, get_listings
-from tests.sample_data import make_listing, make_search_spec
+from hyacinth.db.crud.listing import (
+    add_listings,
+    count_listings,
+    delete_listings_before,
+    delete_unreferenced_listing_contents,
+    get_last_listing,
+    get_listings_before,
+    get_listing_urls,
+    get_first_new_listing_times,
+    get_listings,
+    get_listings_by_price,
+    get_listings_by_title,
+    get_new_listings,
+    iter_listings,
+)
+from hyacinth.db.models import Listing, ListingContent
+from hyacinth.models import BaseListing
+from tests.sample_data import (
+    make_channel_notifier_state,
+    make_listing,
+    make_notifier_search,
+    make_search_spec,
+)
+
+MODULE = "hyacinth.db.crud.listing"
+
+
+class SomeListingModel(BaseListing):
+    url: str
+    thumbnail_url: str | None = None
 
 
 def test_get_listings__multiple_listings__returns_correctly_ordered_and_filtered_result(
@@ -27,6 +57,156 @@ def test_get_listings__multiple_listings__returns_correctly_ordered_and_filtered
         ]
 
 
+def test_get_new_listings__multiple_searches__returns_listings_after_each_search_time(
+    test_db_session: sessionmaker[Session],
+) -> None:
+    some_search_spec = make_search_spec()
+    some_other_search_spec = make_search_spec(search_params_json='{"some": "params"}')
+    some_listings = [
+        make_listing(search_spec=some_search_spec, creation_time=datetime(2023, 1, 8)),
+        make_listing(search_spec=some_search_spec, creation_time=datetime(2023, 1, 2)),
+        make_listing(search_spec=some_other_search_spec, creation_time=datetime(2023, 1, 3)),
+        make_listing(search_spec=some_other_search_spec, creation_time=datetime(2023, 1, 6)),
+        make_listing(search_spec=some_other_search_spec, creation_time=datetime(2023, 1, 1)),
+    ]
+    with test_db_session() as session:
+        session.add_all(some_listings)
+        session.commit()
+
+        assert get_new_listings(
+            session,
+            {
+                some_search_spec.id: datetime(2023, 1, 4),
+                some_other_search_spec.id: datetime(2023, 1, 2),
+            },
+        ) == [some_listings[2], some_listings[3], some_listings[0]]
+
+
+def test_get_new_listings__paginated__returns_each_listing_once_in_order(
+    test_db_session: sessionmaker[Session],
+) -> None:
+    some_search_spec = make_search_spec()
+    # listings with the same creation time are ordered by id
+    some_listings = [
+        make_listing(search_spec=some_search_spec, url=str(i), creation_time=datetime(2023, 1, day))
+        for i, day in enumerate([3, 2, 2, 2, 5, 4, 1])
+    ]
+    with test_db_session() as session:
+        session.add_all(some_listings)
+        session.commit()
+
+        pages = []
+        after_listing = None
+        while True:
+            page = get_new_listings(
+                session,
+                {some_search_spec.id: datetime(2023, 1, 1)},
+                after_listing=after_listing,
+                limit=2,
+            )
+            pages.append([listing.url for listing in page])
+            if len(page) < 2:
+                break
+            after_listing = (page[-1].creation_time, page[-1].id)
+
+        assert pages == [["1", "2"], ["3", "0"], ["5", "4"], []]
+
+
+def test_iter_listings__more_listings_than_batch_size__yields_ordered_batches(
+    test_db_session: sessionmaker[Session],
+) -> None:
+    some_search_spec = make_search_spec()
+    some_listings = [
+        make_listing(
+            search_spec=some_search_spec, url=str(day), creation_time=datetime(2023, 1, day)
+        )
+        for day in [4, 1, 3, 5, 2]
+    ]
+    with test_db_session() as session:
+        session.add_all(some_listings)
+        session.commit()
+
+        batches = iter_listings(session, some_search_spec.id, datetime(2023, 1, 1), batch_size=2)
+
+        assert [[listing.url for listing in batch] for batch in batches] == [["2", "3"], ["4", "5"]]
+
+
+def test_get_new_listings__no_searches__returns_empty_list(
+    test_db_session: sessionmaker[Session],
+) -> None:
+    with test_db_session() as session:
+        assert get_new_listings(session, {}) == []
+
+
+def test_get_new_listings__search_filter__returns_only_matching_listings(
+    test_db_session: sessionmaker[Session],
+) -> None:
+    some_search_spec = make_search_spec()
+    some_listings = [
+        make_listing(search_spec=some_search_spec, listing_json='{"a": 1}'),
+        make_listing(search_spec=some_search_spec, listing_json='{"a": 2}'),
+    ]
+    with test_db_session() as session:
+        session.add_all(some_listings)
+        session.commit()
+
+        assert get_new_listings(
+            session,
+            {some_search_spec.id: datetime(2023, 1, 1)},
+            {some_search_spec.id: ListingContent.listing_json == '{"a": 2}'},
+        ) == [some_listings[1]]
+
+
+def test_get_first_new_listing_times__multiple_searches_and_times__returns_earliest_new_listing_times(
+    test_db_session: sessionmaker[Session],
+) -> None:
+    some_search_spec = make_search_spec()
+    some_other_search_spec = make_search_spec(search_params_json='{"some": "params"}')
+    some_listings = [
+        make_listing(
+            search_spec=some_search_spec,
+            creation_time=datetime(2023, 1, 8),
+            created_at=datetime(2023, 1, 9),
+        ),
+        make_listing(
+            search_spec=some_search_spec,
+            creation_time=datetime(2023, 1, 5),
+            created_at=datetime(2023, 1, 10),
+        ),
+        make_listing(
+            search_spec=some_search_spec,
+            creation_time=datetime(2023, 1, 2),
+            created_at=datetime(2023, 1, 3),
+        ),
+        make_listing(
+            search_spec=some_other_search_spec,
+            creation_time=datetime(2023, 1, 1),
+            created_at=datetime(2023, 1, 2),
+        ),
+    ]
+    with test_db_session() as session:
+        session.add_all(some_listings)
+        session.commit()
+
+        assert get_first_new_listing_times(
+            session,
+            [
+                (some_search_spec.id, datetime(2023, 1, 4)),
+                (some_search_spec.id, datetime(2023, 1, 6)),
+                (some_other_search_spec.id, datetime(2023, 1, 4)),
+            ],
+        ) == {
+            (some_search_spec.id, datetime(2023, 1, 4)): (
+                datetime(2023, 1, 5),
+                datetime(2023, 1, 10),
+            ),
+            (some_search_spec.id, datetime(2023, 1, 6)): (
+                datetime(2023, 1, 8),
+                datetime(2023, 1, 9),
+            ),
+        }
+
+
 def test_get_last_listing__multiple_listings__returns_most_recent_listing(
     test_db_session: sessionmaker[Session],
 ) -> None:
@@ -49,3 +229,260 @@ def test_get_last_listing__no_listings__returns_none(
 ) -> None:
     with test_db_session() as session:
         assert get_last_listing(session, 1) is None
+
+
+def test_count_listings__listings_before_and_after_time__counts_only_recent_listings(
+    test_db_session: sessionmaker[Session],
+) -> None:
+    some_search_spec = make_search_spec()
+    some_listings = [
+        make_listing(search_spec=some_search_spec, created_at=datetime(2023, 1, 1)),
+        make_listing(search_spec=some_search_spec, created_at=datetime(2023, 1, 5)),
+        make_listing(search_spec=some_search_spec, created_at=datetime(2023, 1, 9)),
+    ]
+    with test_db_session() as session:
+        session.add_all(some_listings)
+        session.commit()
+
+        assert count_listings(session, some_search_spec.id, after_time=datetime(2023, 1, 4)) == 2
+
+
+def test_get_listing_urls__listings_before_and_after_time__returns_only_recent_urls(
+    test_db_session: sessionmaker[Session],
+) -> None:
+    some_search_spec = make_search_spec()
+    some_listings = [
+        make_listing(search_spec=some_search_spec, url="old-url", created_at=datetime(2023, 1, 1)),
+        make_listing(search_spec=some_search_spec, url="new-url", created_at=datetime(2023, 1, 5)),
+        make_listing(search_spec=some_search_spec, url=None, created_at=datetime(2023, 1, 9)),
+    ]
+    with test_db_session() as session:
+        session.add_all(some_listings)
+        session.commit()
+
+        assert get_listing_urls(session, some_search_spec.id, datetime(2023, 1, 4)) == {"new-url"}
+
+
+def test_add_listings__some_listings_already_saved__inserts_only_new_listings(
+    test_db_session: sessionmaker[Session],
+) -> None:
+    some_search_spec = make_search_spec()
+    some_listings = [
+        SomeListingModel(url="some-url-1", creation_time=datetime(2023, 1, 1)),
+        SomeListingModel(url="some-url-2", creation_time=datetime(2023, 1, 2)),
+    ]
+    with test_db_session() as session:
+        session.add(some_search_spec)
+        session.commit()
+
+        first_inserted = add_listings(session, some_search_spec.id, some_listings[:1])
+        second_inserted = add_listings(session, some_search_spec.id, some_listings)
+        session.commit()
+
+        assert [listing.url for listing in first_inserted] == ["some-url-1"]
+        assert [listing.url for listing in second_inserted] == ["some-url-2"]
+        assert session.scalar(select(func.count()).select_from(Listing)) == 2
+
+
+def test_add_listings__more_listings_than_batch_size__inserts_all_listings(
+    test_db_session: sessionmaker[Session], mocker: MockerFixture
+) -> None:
+    mocker.patch(f"{MODULE}._INSERT_BATCH_SIZE", 2)
+    some_search_spec = make_search_spec()
+    some_listings = [
+        SomeListingModel(url=f"some-url-{i}", creation_time=datetime(2023, 1, 1)) for i in range(5)
+    ]
+    with test_db_session() as session:
+        session.add(some_search_spec)
+        session.commit()
+
+        inserted = add_listings(session, some_search_spec.id, some_listings)
+        session.commit()
+
+        assert [listing.url for listing in inserted] == [f"some-url-{i}" for i in range(5)]
+        assert session.scalar(select(func.count()).select_from(ListingContent)) == 5
+
+
+def test_add_listings__same_listing_found_by_two_searches__saves_content_once(
+    test_db_session: sessionmaker[Session],
+) -> None:
+    some_search_spec = make_search_spec()
+    some_other_search_spec = make_search_spec(search_params_json='{"some": "params"}')
+    some_listing = SomeListingModel(url="some-url", creation_time=datetime(2023, 1, 1))
+    with test_db_session() as session:
+        session.add_all([some_search_spec, some_other_search_spec])
+        session.commit()
+
+        (inserted,) = add_listings(session, some_search_spec.id, [some_listing, some_listing])
+        (other_inserted,) = add_listings(session, some_other_search_spec.id, [some_listing])
+        session.commit()
+
+        assert inserted.content_id == other_inserted.content_id
+        assert other_inserted.listing_json == some_listing.model_dump_json()
+        assert other_inserted.content.version == 1
+        assert session.scalar(select(func.count()).select_from(ListingContent)) == 1
+        assert session.scalar(select(func.count()).select_from(Listing)) == 2
+
+
+def test_add_listings__same_url_with_different_details__updates_shared_content(
+    test_db_session: sessionmaker[Session],
+) -> None:
+    some_search_spec = make_search_spec()
+    some_other_search_spec = make_search_spec()
+    some_listing = SomeListingModel(
+        url="some-url", thumbnail_url="some-thumbnail", creation_time=datetime(2023, 1, 1)
+    )
+    some_rescraped_listing = some_listing.model_copy(update={"thumbnail_url": "other-thumbnail"})
+    with test_db_session() as session:
+        session.add_all([some_search_spec, some_other_search_spec])
+        session.commit()
+
+        (inserted,) = add_listings(session, some_search_spec.id, [some_listing])
+        (other_inserted,) = add_listings(
+            session, some_other_search_spec.id, [some_rescraped_listing]
+        )
+        session.commit()
+
+        assert inserted.content_id == other_inserted.content_id
+        assert other_inserted.listing_json == some_rescraped_listing.model_dump_json()
+        assert other_inserted.content.version == 2
+        assert session.scalar(select(func.count()).select_from(ListingContent)) == 1
+
+
+def test_get_listings_by_price__price_range__returns_listings_in_range_most_recent_first(
+    test_db_session: sessionmaker[Session],
+) -> None:
+    some_search_spec = make_search_spec()
+    some_listings = [
+        make_listing(
+            search_spec=some_search_spec,
+            listing_json='{"price": 150}',
+            creation_time=datetime(2023, 1, 1),
+        ),
+        make_listing(
+            search_spec=some_search_spec,
+            listing_json='{"price": 99.5}',
+            creation_time=datetime(2023, 1, 2),
+        ),
+        make_listing(
+            search_spec=some_search_spec,
+            listing_json='{"price": 100}',
+            creation_time=datetime(2023, 1, 3),
+        ),
+        make_listing(search_spec=some_search_spec, listing_json="{}"),
+    ]
+    with test_db_session() as session:
+        session.add_all(some_listings)
+        session.commit()
+
+        assert get_listings_by_price(session, some_search_spec.id, max_price=100) == [
+            some_listings[2],
+            some_listings[1],
+        ]
+        assert get_listings_by_price(session, some_search_spec.id, min_price=100) == [
+            some_listings[2],
+            some_listings[0],
+        ]
+
+
+def test_get_listings_by_title__title_with_different_case__returns_matching_listings(
+    test_db_session: sessionmaker[Session],
+) -> None:
+    some_search_spec = make_search_spec()
+    some_listings = [
+        make_listing(search_spec=some_search_spec, listing_json='{"title": "Red Bike"}'),
+        make_listing(search_spec=some_search_spec, listing_json='{"title": "Red Bike!"}'),
+    ]
+    with test_db_session() as session:
+        session.add_all(some_listings)
+        session.commit()
+
+        assert get_listings_by_title(session, some_search_spec.id, "red bike") == [some_listings[0]]
+
+
+def test_delete_listings_before__listings_before_and_after_time__deletes_oldest_listings_up_to_limit(
+    test_db_session: sessionmaker[Session],
+) -> None:
+    some_search_spec = make_search_spec()
+    some_listings = [
+        make_listing(search_spec=some_search_spec, url="3", created_at=datetime(2023, 1, 3)),
+        make_listing(search_spec=some_search_spec, url="1", created_at=datetime(2023, 1, 1)),
+        make_listing(search_spec=some_search_spec, url="2", created_at=datetime(2023, 1, 2)),
+        make_listing(search_spec=some_search_spec, url="5", created_at=datetime(2023, 1, 5)),
+    ]
+    with test_db_session() as session:
+        session.add_all(some_listings)
+        session.commit()
+
+        some_deleted_ids = {some_listings[1].id, some_listings[2].id}
+
+        deleted = delete_listings_before(session, datetime(2023, 1, 4), limit=2)
+
+        assert set(deleted) == some_deleted_ids
+        remaining = session.execute(select(Listing.url)).scalars().all()
+        assert set(remaining) == {"3", "5"}
+
+
+def test_delete_listings_before__unwatched_only__keeps_listings_of_watched_searches(
+    test_db_session: sessionmaker[Session],
+) -> None:
+    some_watched_search_spec = make_search_spec()
+    some_unwatched_search_spec = make_search_spec(search_params_json='{"some": "params"}')
+    some_notifier = make_channel_notifier_state(
+        active_searches=[make_notifier_search(search_spec=some_watched_search_spec)]
+    )
+    some_listings = [
+        make_listing(search_spec=some_watched_search_spec, created_at=datetime(2023, 1, 1)),
+        make_listing(search_spec=some_unwatched_search_spec, created_at=datetime(2023, 1, 1)),
+    ]
+    with test_db_session() as session:
+        session.add(some_notifier)
+        session.add_all(some_listings)
+        session.commit()
+
+        some_unwatched_listing_id = some_listings[1].id
+
+        deleted = delete_listings_before(
+            session, datetime(2023, 1, 2), limit=10, unwatched_only=True
+        )
+
+        assert deleted == [some_unwatched_listing_id]
+        remaining = session.execute(select(Listing.search_spec_id)).scalars().all()
+        assert remaining == [some_watched_search_spec.id]
+
+
+def test_get_listings_before__listings_before_and_after_time__returns_oldest_up_to_limit(
+    test_db_session: sessionmaker[Session],
+) -> None:
+    some_search_spec = make_search_spec()
+    some_listings = [
+        make_listing(search_spec=some_search_spec, url="3", created_at=datetime(2023, 1, 3)),
+        make_listing(search_spec=some_search_spec, url="1", created_at=datetime(2023, 1, 1)),
+        make_listing(search_spec=some_search_spec, url="2", created_at=datetime(2023, 1, 2)),
+        make_listing(search_spec=some_search_spec, url="5", created_at=datetime(2023, 1, 5)),
+    ]
+    with test_db_session() as session:
+        session.add_all(some_listings)
+        session.commit()
+
+        listings = get_listings_before(session, datetime(2023, 1, 4), limit=2)
+
+        assert listings == [some_listings[1], some_listings[2]]
+        assert session.scalar(select(func.count()).select_from(Listing)) == 4
+
+
+def test_delete_unreferenced_listing_contents__listing_deleted__deletes_only_its_content(
+    test_db_session: sessionmaker[Session],
+) -> None:
+    some_listings = [make_listing(url="some-url-1"), make_listing(url="some-url-2")]
+    with test_db_session() as session:
+        session.add_all(some_listings)
+        session.commit()
+        some_kept_content_id = some_listings[1].content_id
+        session.delete(some_listings[0])
+        session.commit()
+
+        assert delete_unreferenced_listing_contents(session, limit=10) == 1
+        session.commit()
+
+        assert session.execute(select(ListingContent.id)).scalars().all() == [some_kept_content_id]
@@ -1,10 +1,21 @@
+from typing import Any
+
 from pytest_mock import MockerFixture
-from sqlalchemy import func, select
+from sqlalchemy import event, func, select
 from sqlalchemy.orm import Session, sessionmaker
 
-from hyacinth.db.crud.notifier import get_channel_notifiers
+from hyacinth.db.crud.notifier import (
+    NotifierStateValues,
+    get_channel_notifiers,
+    update_notifier_states,
+)
 from hyacinth.db.models import ChannelNotifierState, NotifierSearch
-from tests.sample_data import make_channel_notifier_state, make_notifier_search
+from tests.conftest import sqlite_engine
+from tests.sample_data import (
+    make_channel_notifier_state,
+    make_filter,
+    make_notifier_search,
+)
 
 SOME_CHANNEL_ID = 123
 SOME_OTHER_CHANNEL_ID = 456
@@ -41,3 +52,67 @@ def test_get_channel_notifiers__some_channels_do_not_exist__deletes_notifiers_wi
 
         # verify related notifier search was also deleted
         assert session.scalar(select(func.count()).select_from(NotifierSearch)) == 0
+
+
+def test_get_channel_notifiers__many_notifiers__loads_relationships_in_fixed_number_of_queries(
+    test_db_session: sessionmaker[Session], mock_notifier_scheduler: None, mocker: MockerFixture
+) -> None:
+    mock_client = mocker.Mock(get_channel=lambda channel_id: mocker.Mock(id=channel_id))
+    mock_monitor = mocker.Mock()
+    some_saved_states = [
+        make_channel_notifier_state(
+            channel_id=channel_id,
+            active_searches=[make_notifier_search() for _ in range(2)],
+            filters=[make_filter()],
+        )
+        for channel_id in range(10)
+    ]
+    with test_db_session() as session:
+        session.add_all(some_saved_states)
+        session.commit()
+
+    statements: list[str] = []
+
+    def record_statement(*args: Any) -> None:
+        statements.append(args[2])
+
+    with test_db_session() as session:
+        event.listen(sqlite_engine, "before_cursor_execute", record_statement)
+        try:
+            notifiers = get_channel_notifiers(session, mock_client, mock_monitor)
+        finally:
+            event.remove(sqlite_engine, "before_cursor_execute", record_statement)
+
+    assert len(notifiers) == 10
+    assert mock_monitor.register_search.call_count == 20
+    # notifier states, notifier searches, search specs and filters
+    assert len(statements) == 4
+
+
+def test_update_notifier_states__one_notifier_deleted__updates_remaining_notifiers(
+    test_db_session: sessionmaker[Session],
+) -> None:
+    some_saved_states = [
+        make_channel_notifier_state(channel_id=SOME_CHANNEL_ID),
+        make_channel_notifier_state(channel_id=SOME_OTHER_CHANNEL_ID),
+    ]
+    with test_db_session() as session:
+        session.add_all(some_saved_states)
+        session.commit()
+        some_notifier_id = some_saved_states[0].id
+        some_deleted_notifier_id = some_saved_states[1].id
+        session.delete(some_saved_states[1])
+        session.commit()
+
+        some_values = NotifierStateValues(
+            paused=True, notification_frequency_seconds=300, home_latitude=1.0, home_longitude=2.0
+        )
+        update_notifier_states(
+            session, {some_notifier_id: some_values, some_deleted_notifier_id: some_values}
+        )
+        session.commit()
+
+        notifier_state = session.execute(select(ChannelNotifierState)).scalars().one()
+        assert notifier_state.paused
+        assert notifier_state.notification_frequency_seconds == 300
+        assert (notifier_state.home_latitude, notifier_state.home_longitude) == (1.0, 2.0)
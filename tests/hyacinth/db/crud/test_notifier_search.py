@@ -0,0 +1,39 @@
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session, sessionmaker
+
+from hyacinth.db.crud.notifier_search import update_last_notified
+from hyacinth.db.models import NotifierSearch
+from tests.sample_data import make_channel_notifier_state, make_notifier_search
+
+
+def test_update_last_notified__multiple_searches__updates_only_given_searches(
+    test_db_session: sessionmaker[Session],
+) -> None:
+    some_notifier_searches = [
+        make_notifier_search(last_notified=datetime(2023, 1, 1)),
+        make_notifier_search(last_notified=datetime(2023, 1, 1)),
+        make_notifier_search(last_notified=datetime(2023, 1, 1)),
+    ]
+    with test_db_session() as session:
+        session.add(make_channel_notifier_state(active_searches=some_notifier_searches))
+        session.commit()
+
+        update_last_notified(
+            session,
+            {
+                some_notifier_searches[0].id: datetime(2023, 1, 5),
+                some_notifier_searches[2].id: datetime(2023, 1, 9),
+            },
+        )
+        session.commit()
+
+        last_notified = session.execute(
+            select(NotifierSearch.last_notified).order_by(NotifierSearch.id)
+        ).scalars()
+        assert list(last_notified) == [
+            datetime(2023, 1, 5),
+            datetime(2023, 1, 1),
+            datetime(2023, 1, 9),
+        ]
@@ -39,3 +39,19 @@ def test_add_search_spec__identical_spec_exists__does_not_create_new_search_spec
 
         search_spec = session.execute(select(SearchSpec)).scalars().one()
         assert search_spec.id == existing_search_spec.id
+
+
+def test_add_search_spec__same_params_in_different_order__returns_same_search_spec(
+    test_db_session: sessionmaker[Session],
+) -> None:
+    with test_db_session() as session:
+        search_spec = add_search_spec(session, SOME_PLUGIN_PATH, {"a": 1, "b": {"c": 2, "d": 3}})
+        other_search_spec = add_search_spec(
+            session, SOME_PLUGIN_PATH, {"b": {"d": 3, "c": 2}, "a": 1}
+        )
+        session.commit()
+
+        assert other_search_spec.id == search_spec.id
+        assert session.execute(select(SearchSpec)).scalars().one().search_params_json == (
+            '{"a": 1, "b": {"c": 2, "d": 3}}'
+        )
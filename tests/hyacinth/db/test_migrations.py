@@ -0,0 +1,33 @@
+from pytest_mock import MockerFixture
+from sqlalchemy import StaticPool, create_engine, inspect
+
+from hyacinth.db import migrations
+from hyacinth.db.migrations import schema_fingerprint, upgrade_schema
+
+MODULE = "hyacinth.db.migrations"
+
+
+def test_upgrade_schema__schema_up_to_date__skips_create_all_and_migrations(
+    mocker: MockerFixture,
+) -> None:
+    engine = create_engine("sqlite://", poolclass=StaticPool)
+    run_migrations_spy = mocker.spy(migrations, "run_migrations")
+
+    upgrade_schema(engine)
+    assert {"listing", "searchspec", "schema_version"} <= set(inspect(engine).get_table_names())
+    run_migrations_spy.assert_called_once()
+
+    upgrade_schema(engine)
+    run_migrations_spy.assert_called_once()
+
+
+def test_schema_fingerprint__settings_change_schema__returns_different_fingerprint(
+    mocker: MockerFixture,
+) -> None:
+    dialect = create_engine("sqlite://").dialect
+    fingerprint = schema_fingerprint(dialect)
+    assert schema_fingerprint(dialect) == fingerprint
+
+    mocker.patch(f"{MODULE}.settings.listing_title_trigram_index_enabled", True)
+
+    assert schema_fingerprint(dialect) != fingerprint
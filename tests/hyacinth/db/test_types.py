@@ -0,0 +1,14 @@
+from sqlalchemy.dialects import postgresql
+
+from hyacinth.db.types import JSONText
+
+
+def test_json_text_process_result_value__driver_decoded_json__returns_json_string() -> None:
+    assert (
+        JSONText().process_result_value({"title": "some title"}, postgresql.dialect())
+        == '{"title": "some title"}'
+    )
+
+
+def test_json_text_process_result_value__json_string__returns_string_unchanged() -> None:
+    assert JSONText().process_result_value('{"a":1}', postgresql.dialect()) == '{"a":1}'
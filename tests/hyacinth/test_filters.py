@@ -1,5 +1,190 @@
-from hyacinth.filters import _apply_string_rule_expr
+import json
 
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy import select
+from sqlalchemy.orm import Session, sessionmaker
 
-def test__apply_string_rule__some_rule_expression__applies_rule_correctly() -> None:
-    assert _apply_string_rule_expr("foo", "some field that contains Foo")
+from hyacinth import filters
+from hyacinth.db.models import Filter, ListingContent
+from hyacinth.enums import RuleType
+from hyacinth.filters import compile_filters, to_sql_predicate
+from hyacinth.models import BaseListing
+from tests.sample_data import make_filter, make_listing, make_search_spec
+
+SOME_CACHE_KEY = (1, 1)
+
+
+class SomeListingModel(BaseListing):
+    title: str
+    price: float
+    distance_miles: float | None = None
+    image_urls: list[str] = []
+
+
+SOME_LISTINGS = [
+    {"title": "Red road bike", "price": 300, "distance_miles": 5.5},
+    {"title": "Blue bike, broken", "price": 50, "distance_miles": None},
+    {"title": "Kids scooter, 100% working", "price": 20},
+    {"title": "TREK Bike", "price": 1200, "distance_miles": 40},
+    {"title": "Helmet", "price": 35.5, "distance_miles": 2},
+]
+
+
+@pytest.fixture(autouse=True)
+def clear_filter_result_caches() -> None:
+    filters._filter_set_results.clear()
+    filters._rule_results.clear()
+
+
+def test_test__some_string_rule_expression__applies_rule_correctly() -> None:
+    some_filters = compile_filters([make_filter(field="title", rule_expr="foo")])
+
+    assert filters.test({"title": "some field that contains Foo"}, some_filters)
+
+
+def test_test__and_and_or_filters__requires_all_and_rules_and_any_or_rule() -> None:
+    some_filters = compile_filters(
+        [
+            make_filter(field="title", rule_type=RuleType.AND, rule_expr="not broken"),
+            make_filter(field="price", rule_type=RuleType.OR, rule_expr="< 100"),
+            make_filter(field="title", rule_type=RuleType.OR, rule_expr="bike or scooter"),
+        ]
+    )
+
+    assert filters.test({"title": "Red Bike", "price": 500}, some_filters)
+    assert filters.test({"title": "Lamp", "price": 50}, some_filters)
+    assert not filters.test({"title": "Lamp", "price": 500}, some_filters)
+    assert not filters.test({"title": "Broken bike", "price": 50}, some_filters)
+
+
+def test_test__many_keyword_filters__applies_each_rule_to_shared_keyword_matches() -> None:
+    some_filters = compile_filters(
+        [
+            make_filter(field="title", rule_type=RuleType.OR, rule_expr=f"keyword{i}")
+            for i in range(30)
+        ]
+        + [make_filter(field="title", rule_type=RuleType.AND, rule_expr="not broken")]
+    )
+
+    assert filters.test({"title": "Some KEYWORD17 listing"}, some_filters)
+    assert not filters.test({"title": "Some keyword17 listing, broken"}, some_filters)
+    assert not filters.test({"title": "Some keyword listing"}, some_filters)
+
+
+def test_test__same_rules_in_different_order__reuses_filter_set_result(
+    mocker: MockerFixture,
+) -> None:
+    some_filters = [
+        make_filter(field="title", rule_type=RuleType.AND, rule_expr="bike"),
+        make_filter(field="price", rule_type=RuleType.AND, rule_expr="< 100"),
+    ]
+    some_listing = {"title": "Red bike", "price": 50}
+    assert filters.test(some_listing, compile_filters(some_filters), cache_key=SOME_CACHE_KEY)
+
+    apply_rule_spy = mocker.spy(filters, "_apply_rule")
+    other_filters = [
+        make_filter(field="price", rule_type=RuleType.AND, rule_expr="<  100"),
+        make_filter(field="title", rule_type=RuleType.AND, rule_expr="BIKE"),
+    ]
+    assert filters.test(some_listing, compile_filters(other_filters), cache_key=SOME_CACHE_KEY)
+    apply_rule_spy.assert_not_called()
+
+
+def test_test__overlapping_filter_sets__evaluates_shared_rules_once(
+    mocker: MockerFixture,
+) -> None:
+    some_listing = {"title": "Red bike", "price": 50}
+    some_filters = compile_filters([make_filter(field="title", rule_expr="bike")])
+    other_filters = compile_filters(
+        [
+            make_filter(field="title", rule_expr="bike"),
+            make_filter(field="price", rule_type=RuleType.AND, rule_expr="> 100"),
+        ]
+    )
+    assert filters.test(some_listing, some_filters, cache_key=SOME_CACHE_KEY)
+
+    apply_rule_spy = mocker.spy(filters, "_apply_rule")
+    assert not filters.test(some_listing, other_filters, cache_key=SOME_CACHE_KEY)
+    assert apply_rule_spy.call_count == 1
+    assert apply_rule_spy.call_args.args[0].field == "price"
+
+
+@pytest.mark.parametrize(
+    "some_filters",
+    [
+        [],
+        [make_filter(field="price", rule_type=RuleType.AND, rule_expr="< 500")],
+        [make_filter(field="distance_miles", rule_type=RuleType.AND, rule_expr="<= 10")],
+        [make_filter(field="title", rule_type=RuleType.AND, rule_expr="bike and not broken")],
+        [make_filter(field="title", rule_type=RuleType.AND, rule_expr="road bike or (trek)")],
+        [
+            make_filter(field="title", rule_type=RuleType.OR, rule_expr="scooter"),
+            make_filter(field="price", rule_type=RuleType.OR, rule_expr="> 1000"),
+        ],
+        [
+            make_filter(field="title", rule_type=RuleType.OR, rule_expr="helmet"),
+            make_filter(field="image_urls", rule_type=RuleType.OR, rule_expr="jpg"),
+        ],
+        [make_filter(field="condition", rule_type=RuleType.AND, rule_expr="> 3")],
+    ],
+)
+def test_to_sql_predicate__some_filters__selects_every_listing_that_passes_filters(
+    test_db_session: sessionmaker[Session], some_filters: list[Filter]
+) -> None:
+    some_search_spec = make_search_spec()
+    with test_db_session() as session:
+        session.add_all(
+            make_listing(search_spec=some_search_spec, listing_json=json.dumps(listing))
+            for listing in SOME_LISTINGS
+        )
+        session.commit()
+
+        compiled_filters = compile_filters(some_filters)
+        selected_listings = (
+            session.execute(
+                select(ListingContent.listing_json).where(
+                    to_sql_predicate(compiled_filters, SomeListingModel)
+                )
+            )
+            .scalars()
+            .all()
+        )
+
+    passing_listings = [
+        listing
+        for listing in SOME_LISTINGS
+        if filters.test({k: v for k, v in listing.items() if v is not None}, compiled_filters)
+    ]
+    for listing in passing_listings:
+        assert json.dumps(listing) in selected_listings
+
+
+def test_to_sql_predicate__translatable_filters__excludes_listings_that_fail_filters(
+    test_db_session: sessionmaker[Session],
+) -> None:
+    some_search_spec = make_search_spec()
+    some_filters = compile_filters(
+        [
+            make_filter(field="title", rule_type=RuleType.AND, rule_expr="bike and not broken"),
+            make_filter(field="price", rule_type=RuleType.AND, rule_expr="< 500"),
+        ]
+    )
+    with test_db_session() as session:
+        session.add_all(
+            make_listing(search_spec=some_search_spec, listing_json=json.dumps(listing))
+            for listing in SOME_LISTINGS
+        )
+        session.commit()
+
+        selected_listings = (
+            session.execute(
+                select(ListingContent.listing_json).where(
+                    to_sql_predicate(some_filters, SomeListingModel)
+                )
+            )
+            .scalars()
+            .all()
+        )
+
+    assert selected_listings == [json.dumps(SOME_LISTINGS[0])]
@@ -0,0 +1,109 @@
+from datetime import datetime, timedelta
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from hyacinth.db.models import Listing, SearchSpec
+from hyacinth.models import BaseListing
+from hyacinth.monitor import ListingArrivalRate, SearchMonitor
+from tests.sample_data import make_listing, make_search_spec
+
+MODULE = "hyacinth.monitor"
+
+SOME_POLL_TIME = datetime(2023, 1, 1)
+
+
+class SomeListingModel(BaseListing):
+    url: str
+
+
+@pytest.fixture
+def monitor(mocker: MockerFixture) -> SearchMonitor:
+    mocker.patch(f"{MODULE}.PollScheduler")
+    return SearchMonitor()
+
+
+def test_listing_arrival_rate_polling_interval__no_listings_found__returns_max_interval() -> None:
+    arrival_rate = ListingArrivalRate(listings_per_second=0, last_poll_time=SOME_POLL_TIME)
+    arrival_rate.update(0, SOME_POLL_TIME + timedelta(minutes=10))
+
+    assert arrival_rate.polling_interval(5, min_seconds=60, max_seconds=3600) == 3600
+
+
+def test_listing_arrival_rate_polling_interval__busy_search__shortens_interval_to_bounds() -> None:
+    arrival_rate = ListingArrivalRate(listings_per_second=0.01, last_poll_time=SOME_POLL_TIME)
+    # 5 listings per poll at 0.01 listings/second means polling every 500 seconds
+    assert arrival_rate.polling_interval(5, min_seconds=60, max_seconds=3600) == 500
+
+    for i in range(1, 20):
+        arrival_rate.update(600, SOME_POLL_TIME + timedelta(minutes=10 * i))
+
+    assert arrival_rate.polling_interval(5, min_seconds=60, max_seconds=3600) == 60
+
+
+def test_publish__subscribed_searches__delivers_listings_only_to_subscribers_of_search(
+    monitor: SearchMonitor, mocker: MockerFixture
+) -> None:
+    some_search_spec = SearchSpec(id=1, plugin_path="some_plugin_path")
+    some_other_search_spec = SearchSpec(id=2, plugin_path="some_plugin_path")
+    some_listings = [make_listing(search_spec=some_search_spec)]
+    subscriber = mocker.Mock()
+    other_subscriber = mocker.Mock()
+    mocker.patch.object(SearchSpec, "plugin")
+    mocker.patch.object(SearchSpec, "search_params")
+
+    monitor.register_search(some_search_spec, subscriber)
+    monitor.register_search(some_search_spec, subscriber)
+    monitor.register_search(some_other_search_spec, other_subscriber)
+    monitor.publish(some_search_spec.id, some_listings)
+
+    subscriber.assert_called_once_with(some_search_spec.id, some_listings)
+    other_subscriber.assert_not_called()
+
+
+def test_publish__subscriber_removed__stops_delivering_listings(
+    monitor: SearchMonitor, mocker: MockerFixture
+) -> None:
+    some_search_spec = SearchSpec(id=1, plugin_path="some_plugin_path")
+    subscriber = mocker.Mock()
+    mocker.patch.object(SearchSpec, "plugin")
+    mocker.patch.object(SearchSpec, "search_params")
+
+    monitor.register_search(some_search_spec, subscriber)
+    monitor.remove_search(some_search_spec, subscriber)
+    monitor.publish(some_search_spec.id, [make_listing(search_spec=some_search_spec)])
+
+    subscriber.assert_not_called()
+
+
+async def test_poll_search__new_listings__saves_and_publishes_listings(
+    test_db_async_session: async_sessionmaker[AsyncSession],
+    monitor: SearchMonitor,
+    mocker: MockerFixture,
+) -> None:
+    some_search_spec = make_search_spec()
+    async with test_db_async_session() as session:
+        session.add(some_search_spec)
+        await session.commit()
+    some_listings = [
+        SomeListingModel(url=f"some-url-{i}", creation_time=datetime(2023, 1, 1)) for i in range(2)
+    ]
+    mock_plugin = mocker.patch.object(SearchSpec, "plugin")
+    mocker.patch.object(SearchSpec, "search_params")
+    mock_plugin.get_listings = mocker.AsyncMock(return_value=some_listings)
+    subscriber = mocker.Mock()
+
+    monitor.register_search(some_search_spec, subscriber)
+    await monitor.poll_search(some_search_spec)
+
+    assert mock_plugin.get_listings.call_args.kwargs["seen_urls"] == set()
+    ((search_spec_id, published_listings),) = [call.args for call in subscriber.call_args_list]
+    assert search_spec_id == some_search_spec.id
+    # the listings are used after their session is closed, so must not have been expired
+    assert [listing.listing_json for listing in published_listings] == [
+        listing.model_dump_json() for listing in some_listings
+    ]
+    async with test_db_async_session() as session:
+        assert await session.scalar(select(func.count()).select_from(Listing)) == 2
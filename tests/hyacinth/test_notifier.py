@@ -0,0 +1,243 @@
+from datetime import datetime
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from hyacinth import notifier as notifier_module
+from hyacinth.db.models import SearchSpec
+from hyacinth.filters import compile_filters
+from hyacinth.models import ListingMetadata
+from hyacinth.notifier import ListingNotifier, LoggerNotifier, decode_listing
+from tests.sample_data import make_filter, make_listing, make_notifier_search, make_search_spec
+
+MODULE = "hyacinth.notifier"
+
+
+@pytest.fixture
+def notifier(mock_notifier_scheduler: None, mocker: MockerFixture) -> LoggerNotifier:
+    mocker.patch(f"{MODULE}.AsyncSession")
+    mocker.patch.object(SearchSpec, "plugin")
+    some_search_spec = make_search_spec()
+    some_search_spec.id = 1
+    some_notifier_search = make_notifier_search(
+        last_notified=datetime(2023, 1, 2), search_spec=some_search_spec
+    )
+    some_notifier_search.search_spec_id = some_search_spec.id
+    return LoggerNotifier(
+        mocker.Mock(), ListingNotifier.Config(active_searches=[some_notifier_search])
+    )
+
+
+async def test_get_new_listings__listings_pushed__returns_new_listings_without_querying_db(
+    notifier: LoggerNotifier, mocker: MockerFixture
+) -> None:
+    get_new_listings_mock = mocker.patch(f"{MODULE}.get_new_listings")
+    notifier.needs_catch_up = False
+    search = notifier.config.active_searches[0]
+    some_listings = [
+        make_listing(creation_time=datetime(2023, 1, 5), created_at=datetime(2023, 1, 6)),
+        make_listing(creation_time=datetime(2023, 1, 1), created_at=datetime(2023, 1, 6)),
+        make_listing(creation_time=datetime(2023, 1, 3), created_at=datetime(2023, 1, 4)),
+    ]
+    for listing in some_listings:
+        listing.updated_at = listing.created_at
+
+    notifier.on_new_listings(search.search_spec_id, some_listings)
+    listings = await notifier._get_new_listings()
+
+    get_new_listings_mock.assert_not_called()
+    assert [lm.listing for lm in listings] == [some_listings[2], some_listings[0]]
+    assert search.last_notified == datetime(2023, 1, 4)
+    assert await notifier._get_new_listings() == []
+
+
+async def test_get_new_listings__catch_up__queries_db_in_pages_and_keeps_matching_listings(
+    notifier: LoggerNotifier, mocker: MockerFixture
+) -> None:
+    mocker.patch(f"{MODULE}.settings.notifier_catch_up_batch_size", 2)
+    session = notifier_module.AsyncSession.return_value.__aenter__.return_value  # type: ignore
+    session.run_sync = mocker.AsyncMock(side_effect=lambda fn, *args: fn(mocker.Mock(), *args))
+    notifier.config.filters.append(make_filter(field="title", rule_expr="bike"))
+    notifier.compiled_filters = compile_filters(notifier.config.filters)
+    some_listings = [
+        make_listing(listing_json='{"title": "red bike"}', creation_time=datetime(2023, 1, 3)),
+        make_listing(listing_json='{"title": "scooter"}', creation_time=datetime(2023, 1, 4)),
+        make_listing(listing_json='{"title": "blue bike"}', creation_time=datetime(2023, 1, 5)),
+    ]
+    for listing_id, listing in enumerate(some_listings, start=201):
+        listing.id = listing.content_id = listing_id
+        listing.search_spec_id = 1
+        listing.created_at = listing.updated_at = listing.creation_time
+    get_new_listings_mock = mocker.patch(
+        f"{MODULE}.get_new_listings", side_effect=[some_listings[:2], some_listings[2:]]
+    )
+    mocker.patch(
+        f"{MODULE}.get_first_new_listing_times",
+        return_value={(1, datetime(2023, 1, 2)): (datetime(2023, 1, 3), datetime(2023, 1, 3))},
+    )
+
+    listings = await notifier._get_new_listings()
+
+    assert [lm.listing for lm in listings] == [some_listings[0], some_listings[2]]
+    assert [call.args[3] for call in get_new_listings_mock.call_args_list] == [
+        None,
+        (datetime(2023, 1, 4), 202),
+    ]
+    assert notifier.config.active_searches[0].last_notified == datetime(2023, 1, 3)
+
+
+async def test_get_new_listings__catch_up_with_two_searches_on_one_spec__returns_new_listings_for_each(
+    notifier: LoggerNotifier, mocker: MockerFixture
+) -> None:
+    session = notifier_module.AsyncSession.return_value.__aenter__.return_value  # type: ignore
+    session.run_sync = mocker.AsyncMock(side_effect=lambda fn, *args: fn(mocker.Mock(), *args))
+    search = notifier.config.active_searches[0]
+    later_search = make_notifier_search(
+        last_notified=datetime(2023, 1, 4), search_spec=search.search_spec
+    )
+    later_search.search_spec_id = search.search_spec_id
+    notifier.config.active_searches.append(later_search)
+    some_listings = [
+        make_listing(creation_time=datetime(2023, 1, 3)),
+        make_listing(creation_time=datetime(2023, 1, 5)),
+    ]
+    for listing_id, listing in enumerate(some_listings, start=301):
+        listing.id = listing.content_id = listing_id
+        listing.search_spec_id = search.search_spec_id
+        listing.created_at = listing.updated_at = listing.creation_time
+    mocker.patch(f"{MODULE}.get_new_listings", return_value=some_listings)
+    mocker.patch(
+        f"{MODULE}.get_first_new_listing_times",
+        return_value={
+            (1, datetime(2023, 1, 2)): (datetime(2023, 1, 3), datetime(2023, 1, 3)),
+            (1, datetime(2023, 1, 4)): (datetime(2023, 1, 5), datetime(2023, 1, 5)),
+        },
+    )
+
+    listings = await notifier._get_new_listings()
+
+    assert [lm.listing for lm in listings] == [some_listings[0], some_listings[1], some_listings[1]]
+    assert search.last_notified == datetime(2023, 1, 3)
+    assert later_search.last_notified == datetime(2023, 1, 5)
+
+
+async def test_get_new_listings__catch_up_query_fails__catches_up_again_on_next_run(
+    notifier: LoggerNotifier, mocker: MockerFixture
+) -> None:
+    session = notifier_module.AsyncSession.return_value.__aenter__.return_value  # type: ignore
+    session.run_sync = mocker.AsyncMock(side_effect=lambda fn, *args: fn(mocker.Mock(), *args))
+    mocker.patch(
+        f"{MODULE}.get_new_listings",
+        side_effect=OperationalError("SELECT", {}, Exception("some db error")),
+    )
+
+    with pytest.raises(OperationalError):
+        await notifier._get_new_listings()
+    notifier.on_new_listings(1, [make_listing()])
+
+    assert notifier.needs_catch_up
+    assert not notifier.pending_listings
+
+
+async def test_get_new_listings__catch_up_fails_with_non_db_error__does_not_catch_up_again(
+    notifier: LoggerNotifier, mocker: MockerFixture
+) -> None:
+    session = notifier_module.AsyncSession.return_value.__aenter__.return_value  # type: ignore
+    session.run_sync = mocker.AsyncMock(side_effect=lambda fn, *args: fn(mocker.Mock(), *args))
+    mocker.patch(f"{MODULE}.get_new_listings", side_effect=RuntimeError("some error"))
+
+    with pytest.raises(RuntimeError):
+        await notifier._get_new_listings()
+
+    assert not notifier.needs_catch_up
+
+
+async def test_get_new_listings__filter_error_on_one_listing__skips_only_that_listing(
+    notifier: LoggerNotifier, mocker: MockerFixture
+) -> None:
+    notifier.needs_catch_up = False
+    notifier.config.filters.append(make_filter(field="price", rule_expr="< 100"))
+    notifier.compiled_filters = compile_filters(notifier.config.filters)
+    some_listings = [
+        make_listing(listing_json='{"price": null}', creation_time=datetime(2023, 1, 3)),
+        make_listing(listing_json='{"price": 50}', creation_time=datetime(2023, 1, 4)),
+    ]
+    for listing in some_listings:
+        listing.created_at = listing.updated_at = listing.creation_time
+
+    notifier.on_new_listings(1, some_listings)
+    listings = await notifier._get_new_listings()
+
+    assert [lm.listing for lm in listings] == [some_listings[1]]
+    assert notifier.config.active_searches[0].last_notified == datetime(2023, 1, 3)
+
+
+async def test_get_new_listings__catch_up_from_db__returns_new_listings_with_their_content(
+    notifier: LoggerNotifier,
+    test_db_async_session: async_sessionmaker[AsyncSession],
+    mocker: MockerFixture,
+) -> None:
+    mocker.patch(f"{MODULE}.AsyncSession", test_db_async_session)
+    mocker.patch(f"{MODULE}.settings.notifier_catch_up_batch_size", 2)
+    search = notifier.config.active_searches[0]
+    some_listings = [
+        make_listing(
+            search_spec=search.search_spec,
+            listing_json=f'{{"title": "listing {day}"}}',
+            creation_time=datetime(2023, 1, day),
+            created_at=datetime(2023, 1, day),
+        )
+        for day in [1, 3, 4, 5]
+    ]
+    async with test_db_async_session() as session:
+        session.add_all(some_listings)
+        await session.commit()
+
+    listings = await notifier._get_new_listings()
+
+    # the listings are used after their session is closed, so their content must be loaded
+    assert [lm.listing.listing_json for lm in listings] == [
+        '{"title": "listing 3"}',
+        '{"title": "listing 4"}',
+        '{"title": "listing 5"}',
+    ]
+    assert search.last_notified == datetime(2023, 1, 3)
+
+
+async def test_on_new_listings__notifier_paused__drops_listings(notifier: LoggerNotifier) -> None:
+    notifier.config.paused = True
+
+    notifier.on_new_listings(1, [make_listing()])
+
+    assert not notifier.pending_listings
+
+
+def test_update_filter__rule_changed__filters_listings_with_new_rule(
+    notifier: LoggerNotifier, mocker: MockerFixture
+) -> None:
+    mocker.patch(f"{MODULE}.Session")
+    some_filter = make_filter(field="title", rule_expr="bike")
+    notifier.config.filters.append(some_filter)
+    notifier.compiled_filters = compile_filters(notifier.config.filters)
+    some_listing_metadata = ListingMetadata(
+        listing=make_listing(listing_json='{"title": "scooter"}'), plugin=mocker.Mock()
+    )
+    assert not notifier.should_notify_listing(some_listing_metadata)
+
+    notifier.update_filter(some_filter, "scooter")
+
+    assert notifier.should_notify_listing(some_listing_metadata)
+
+
+def test_decode_listing__same_listing_decoded_twice__parses_json_once(
+    mocker: MockerFixture,
+) -> None:
+    some_listing = make_listing(listing_json='{"title": "some title"}')
+    some_listing.content_id = 123
+    json_loads_spy = mocker.spy(notifier_module.json, "loads")
+
+    assert decode_listing(some_listing) == {"title": "some title"}
+    assert decode_listing(some_listing) is decode_listing(some_listing)
+    json_loads_spy.assert_called_once()
@@ -0,0 +1,109 @@
+import asyncio
+
+import pytest
+from pytest_mock import MockerFixture
+
+from hyacinth.db.models import SearchSpec
+from hyacinth.poll_scheduler import PollScheduler
+
+MODULE = "hyacinth.poll_scheduler"
+
+
+@pytest.fixture(autouse=True)
+def mock_scheduler(mocker: MockerFixture) -> None:
+    mocker.patch(f"{MODULE}.get_async_scheduler")
+
+
+async def test_dispatch__domain_budget_exhausted__defers_polls_for_that_domain() -> None:
+    release = asyncio.Event()
+    polled: list[int] = []
+
+    async def poll(search_spec: SearchSpec) -> None:
+        polled.append(search_spec.id)
+        await release.wait()
+
+    poll_scheduler = PollScheduler(
+        poll, max_concurrency=10, max_concurrency_per_domain=1, jitter_seconds=0
+    )
+    poll_scheduler.add(SearchSpec(id=1), interval_seconds=600, domain="some-domain")
+    poll_scheduler.add(SearchSpec(id=2), interval_seconds=600, domain="some-domain")
+    poll_scheduler.add(SearchSpec(id=3), interval_seconds=600, domain="some-other-domain")
+
+    await poll_scheduler.dispatch()
+    await asyncio.sleep(0)
+    assert sorted(polled) == [1, 3]
+
+    release.set()
+    await asyncio.sleep(0)
+    await poll_scheduler.dispatch()
+    await asyncio.sleep(0)
+    assert sorted(polled) == [1, 2, 3]
+
+
+async def test_dispatch__global_budget_exhausted__starts_at_most_max_concurrency_polls() -> None:
+    release = asyncio.Event()
+
+    async def poll(search_spec: SearchSpec) -> None:
+        await release.wait()
+
+    poll_scheduler = PollScheduler(
+        poll, max_concurrency=2, max_concurrency_per_domain=10, jitter_seconds=0
+    )
+    for i in range(5):
+        poll_scheduler.add(SearchSpec(id=i), interval_seconds=600, domain=f"domain-{i}")
+
+    await poll_scheduler.dispatch()
+
+    assert poll_scheduler.running == 2
+    release.set()
+
+
+async def test_dispatch__search_removed__does_not_poll_search() -> None:
+    polled: list[int] = []
+
+    async def poll(search_spec: SearchSpec) -> None:
+        polled.append(search_spec.id)
+
+    poll_scheduler = PollScheduler(poll, jitter_seconds=0)
+    poll_scheduler.add(SearchSpec(id=1), interval_seconds=600, domain="some-domain")
+    poll_scheduler.remove(1)
+
+    await poll_scheduler.dispatch()
+    await asyncio.sleep(0)
+
+    assert polled == []
+
+
+async def test_set_interval__during_poll__reschedules_poll_with_new_interval(
+    mocker: MockerFixture,
+) -> None:
+    mocker.patch(f"{MODULE}.time.monotonic", return_value=1000)
+
+    async def poll(search_spec: SearchSpec) -> None:
+        poll_scheduler.set_interval(search_spec.id, 60)
+
+    poll_scheduler = PollScheduler(poll, jitter_seconds=0)
+    poll_scheduler.add(SearchSpec(id=1), interval_seconds=600, domain="some-domain")
+
+    await poll_scheduler.dispatch()
+    await asyncio.sleep(0)
+
+    assert poll_scheduler.jobs[1].due_time == 1060
+
+
+async def test_set_interval__search_removed_during_poll__does_not_reschedule_poll() -> None:
+    polled: list[int] = []
+
+    async def poll(search_spec: SearchSpec) -> None:
+        poll_scheduler.remove(search_spec.id)
+        poll_scheduler.set_interval(search_spec.id, 60)
+        polled.append(search_spec.id)
+
+    poll_scheduler = PollScheduler(poll, jitter_seconds=0)
+    poll_scheduler.add(SearchSpec(id=1), interval_seconds=600, domain="some-domain")
+
+    await poll_scheduler.dispatch()
+    await asyncio.sleep(0)
+
+    assert polled == [1]
+    assert poll_scheduler.jobs == {}
@@ -0,0 +1,122 @@
+import gzip
+import json
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from pytest_mock import MockerFixture
+from sqlalchemy import select
+from sqlalchemy.orm import Session, sessionmaker
+
+from hyacinth.db.models import Listing, ListingContent
+from hyacinth.retention import delete_expired_listings
+from tests.sample_data import (
+    make_channel_notifier_state,
+    make_listing,
+    make_notifier_search,
+    make_search_spec,
+)
+
+MODULE = "hyacinth.retention"
+
+
+def test_delete_expired_listings__old_and_unwatched_listings__deletes_and_archives_in_batches(
+    test_db_session: sessionmaker[Session], mocker: MockerFixture, tmp_path: Path
+) -> None:
+    mocker.patch(f"{MODULE}.Session", test_db_session)
+    mocker.patch(f"{MODULE}.settings.listing_retention_days", 30)
+    mocker.patch(f"{MODULE}.settings.listing_retention_batch_size", 2)
+    mocker.patch(f"{MODULE}.settings.notifier_backdate_time_hours", 6)
+    mocker.patch(f"{MODULE}.settings.listing_archive_folder", str(tmp_path))
+
+    now = datetime.utcnow()
+    some_watched_search_spec = make_search_spec()
+    some_unwatched_search_spec = make_search_spec(search_params_json='{"some": "params"}')
+    some_notifier = make_channel_notifier_state(
+        active_searches=[make_notifier_search(search_spec=some_watched_search_spec)]
+    )
+    some_listings = [
+        # expired
+        *(
+            make_listing(
+                search_spec=some_watched_search_spec,
+                listing_json=f'{{"n": {i}}}',
+                url=f"expired-{i}",
+                created_at=now - timedelta(days=31 + i),
+            )
+            for i in range(5)
+        ),
+        # kept
+        make_listing(
+            search_spec=some_watched_search_spec, url="recent", created_at=now - timedelta(days=1)
+        ),
+        # unwatched, but too old to be backdated
+        make_listing(
+            search_spec=some_unwatched_search_spec,
+            url="unwatched-old",
+            created_at=now - timedelta(hours=7),
+        ),
+        # unwatched, but could still be backdated to a new notifier
+        make_listing(
+            search_spec=some_unwatched_search_spec,
+            url="unwatched-recent",
+            created_at=now - timedelta(hours=1),
+        ),
+    ]
+    with test_db_session() as session:
+        session.add(some_notifier)
+        session.add_all(some_listings)
+        session.commit()
+
+    delete_expired_listings()
+
+    with test_db_session() as session:
+        remaining = session.execute(select(Listing.url)).scalars().all()
+        remaining_contents = session.execute(select(ListingContent.listing_json)).scalars().all()
+    assert set(remaining) == {"recent", "unwatched-recent"}
+    assert len(remaining_contents) == 2
+
+    (archive,) = tmp_path.iterdir()
+    with gzip.open(archive, "rt", encoding="utf-8") as f:
+        archived = [json.loads(line) for line in f]
+    assert {row["url"] for row in archived} == {f"expired-{i}" for i in range(5)} | {
+        "unwatched-old"
+    }
+    assert {row["listing"]["n"] for row in archived if "n" in row["listing"]} == set(range(5))
+
+
+def test_delete_expired_listings__no_archive_folder__deletes_expired_listings(
+    test_db_session: sessionmaker[Session], mocker: MockerFixture
+) -> None:
+    mocker.patch(f"{MODULE}.Session", test_db_session)
+    mocker.patch(f"{MODULE}.settings.listing_retention_days", 30)
+    mocker.patch(f"{MODULE}.settings.listing_retention_batch_size", 2)
+    mocker.patch(f"{MODULE}.settings.listing_archive_folder", None)
+    archive_listings_mock = mocker.patch(f"{MODULE}.archive_listings")
+
+    now = datetime.utcnow()
+    some_search_spec = make_search_spec()
+    some_notifier = make_channel_notifier_state(
+        active_searches=[make_notifier_search(search_spec=some_search_spec)]
+    )
+    some_listings = [
+        *(
+            make_listing(
+                search_spec=some_search_spec,
+                url=f"expired-{i}",
+                created_at=now - timedelta(days=31 + i),
+            )
+            for i in range(3)
+        ),
+        make_listing(search_spec=some_search_spec, url="recent", created_at=now),
+    ]
+    with test_db_session() as session:
+        session.add(some_notifier)
+        session.add_all(some_listings)
+        session.commit()
+
+    delete_expired_listings()
+
+    with test_db_session() as session:
+        remaining = session.execute(select(Listing.url)).scalars().all()
+    assert remaining == ["recent"]
+    archive_listings_mock.assert_not_called()
@@ -0,0 +1,64 @@
+from datetime import datetime
+
+import pytest
+from pytest_mock import MockerFixture
+from sqlalchemy import select
+from sqlalchemy.orm import Session, sessionmaker
+
+from hyacinth.db.crud.notifier import NotifierStateValues
+from hyacinth.db.models import ChannelNotifierState, NotifierSearch
+from hyacinth.state_store import NotifierStateStore
+from tests.sample_data import make_channel_notifier_state, make_notifier_search
+
+MODULE = "hyacinth.state_store"
+
+SOME_VALUES = NotifierStateValues(
+    paused=True, notification_frequency_seconds=300, home_latitude=None, home_longitude=None
+)
+
+
+def test_flush__repeated_changes__writes_latest_changes_once(
+    test_db_session: sessionmaker[Session], mocker: MockerFixture
+) -> None:
+    session_mock = mocker.patch(f"{MODULE}.Session", mocker.Mock(wraps=test_db_session))
+    some_notifier_search = make_notifier_search(last_notified=datetime(2023, 1, 1))
+    some_notifier_state = make_channel_notifier_state(active_searches=[some_notifier_search])
+    with test_db_session() as session:
+        session.add(some_notifier_state)
+        session.commit()
+        notifier_id, notifier_search_id = some_notifier_state.id, some_notifier_search.id
+
+    store = NotifierStateStore()
+    store.save_last_notified({notifier_search_id: datetime(2023, 1, 2)})
+    store.save_notifier_state(notifier_id, SOME_VALUES)
+    store.save_last_notified({notifier_search_id: datetime(2023, 1, 3)})
+    store.flush()
+    store.flush()
+
+    session_mock.assert_called_once()
+    with test_db_session() as session:
+        assert session.execute(select(NotifierSearch.last_notified)).scalar_one() == datetime(
+            2023, 1, 3
+        )
+        assert session.execute(select(ChannelNotifierState.paused)).scalar_one()
+
+
+def test_flush__write_fails__keeps_changes_not_superseded_for_next_flush(
+    mocker: MockerFixture,
+) -> None:
+    session_mock = mocker.patch(f"{MODULE}.Session")
+    update_last_notified_mock = mocker.patch(
+        f"{MODULE}.update_last_notified", side_effect=[Exception("some error"), None]
+    )
+    store = NotifierStateStore()
+    store.save_last_notified({1: datetime(2023, 1, 1), 2: datetime(2023, 1, 1)})
+
+    with pytest.raises(Exception, match="some error"):
+        store.flush()
+    store.save_last_notified({2: datetime(2023, 1, 2)})
+    store.flush()
+
+    update_last_notified_mock.assert_called_with(
+        session_mock.return_value.__enter__.return_value,
+        {1: datetime(2023, 1, 1), 2: datetime(2023, 1, 2)},
+    )
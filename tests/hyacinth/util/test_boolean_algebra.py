@@ -0,0 +1,159 @@
+import random
+
+import pytest
+from boolean import TOKEN_SYMBOL, ParseError, boolean
+
+from hyacinth.util.boolean_algebra import (
+    _TOKENS,
+    algebra,
+    compile_expression,
+    evaluate_expression,
+    parse_expression,
+)
+from hyacinth.util.keyword_matcher import KeywordMatcher
+
+SOME_WORDS = ["bike", "red", "scooter", "broken", "helmet", "parts", "true", "false"]
+SOME_TOKENS = SOME_WORDS + [
+    "and",
+    "or",
+    "not",
+    "AND",
+    "Or",
+    "True",
+    "None",
+    "(",
+    ")",
+    "&",
+    "|",
+    "!",
+]
+
+
+def _tokenize_original(expr: str) -> list:
+    """
+    The original tokenizer, which the single-pass tokenizer replaced.
+    """
+    tokens = []
+    position = 0
+    length = len(expr)
+    while position < length:
+        tok = expr[position]
+
+        sym = tok.isalnum() or tok == "_"
+        if sym:
+            position += 1
+            while position < length:
+                char = expr[position]
+                if char.isalnum() or char in algebra.allowed_in_token:
+                    position += 1
+                    tok += char
+                else:
+                    break
+            position -= 1
+
+        try:
+            tokens.append((_TOKENS[tok.lower()], tok, position))
+        except KeyError as e:
+            if sym:
+                tokens.append((TOKEN_SYMBOL, tok, position))
+            elif tok not in (" ", "\t", "\r", "\n"):
+                raise ParseError(
+                    token_string=tok, position=position, error_code=boolean.PARSE_UNKNOWN_TOKEN
+                ) from e
+
+        position += 1
+
+    i = len(tokens) - 1
+    while i > 0:
+        if tokens[i][1] in _TOKENS:
+            i -= 1
+            continue
+
+        pos = tokens[i][2]
+        new_token = ""
+        j = i - 1
+        while j >= 0 and tokens[j][1] not in _TOKENS:
+            new_token = tokens[j + 1][1] + " " + new_token
+            tokens.pop(j + 1)
+            j -= 1
+        new_token = (tokens[j + 1][1] + " " + new_token)[:-1]
+        tokens.pop(j + 1)
+
+        tokens.insert(j + 1, (TOKEN_SYMBOL, new_token, pos))
+        i -= i - j
+
+    return tokens
+
+
+def _random_expression(rng: random.Random, depth: int = 0) -> str:
+    if depth >= 3 or rng.random() < 0.3:
+        return " ".join(rng.sample(SOME_WORDS[:6], rng.randint(1, 2)))
+
+    kind = rng.choice(["and", "or", "not", "parens"])
+    if kind == "not":
+        return f"not {_random_expression(rng, depth + 1)}"
+    if kind == "parens":
+        return f"({_random_expression(rng, depth + 1)})"
+    return f"{_random_expression(rng, depth + 1)} {kind} {_random_expression(rng, depth + 1)}"
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_compile_expression__random_expressions__matches_evaluate_expression(seed: int) -> None:
+    rng = random.Random(seed)
+    some_texts = [" ".join(rng.choices(SOME_WORDS, k=rng.randint(0, 6))) for _ in range(20)]
+
+    for _ in range(10):
+        expression = parse_expression(_random_expression(rng))
+        predicate = compile_expression(expression)
+        for text in some_texts:
+            try:
+                expected = evaluate_expression(expression, text)
+            except TypeError:
+                # simplify() cannot always reduce negated expressions to a boolean
+                continue
+            assert predicate(text) == expected, (expression, text)
+
+            # evaluating against the keywords found in the text gives the same result
+            symbols = [symbol.obj for symbol in expression.get_symbols()]
+            matched_keywords = KeywordMatcher(symbols).match(text)
+            assert predicate(matched_keywords) == expected, (expression, text)
+
+
+def test_compile_expression__true_and_false_literals__evaluates_literals() -> None:
+    assert compile_expression(parse_expression("true or bike"))("")
+    assert not compile_expression(parse_expression("false and bike"))("bike")
+
+
+def test_compile_expression__negated_or__evaluates_expression() -> None:
+    predicate = compile_expression(parse_expression("not (helmet or parts)"))
+
+    assert not predicate("red bike with helmet")
+    assert predicate("red bike")
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_tokenize__random_token_sequences__matches_original_tokenizer(seed: int) -> None:
+    rng = random.Random(seed)
+    for _ in range(50):
+        separator = rng.choice(["", " ", "\n\t"])
+        expr = separator.join(rng.choices(SOME_TOKENS, k=rng.randint(0, 12)))
+
+        try:
+            expected = _tokenize_original(expr)
+        except ParseError:
+            with pytest.raises(ParseError):
+                algebra.tokenize(expr)
+            continue
+
+        assert algebra.tokenize(expr) == expected, expr
+
+
+def test_tokenize__multi_word_symbols__merges_words() -> None:
+    tokens = algebra.tokenize("road bike or (gravel  bike and not kids)")
+
+    symbols = [tok for token, tok, _ in tokens if token == TOKEN_SYMBOL]
+    assert symbols == ["road bike", "gravel bike", "kids"]
+
+
+def test_parse_expression__same_rule__returns_cached_expression() -> None:
+    assert parse_expression("red bike or scooter") is parse_expression("red bike or scooter")
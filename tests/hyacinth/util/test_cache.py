@@ -0,0 +1,31 @@
+from pytest_mock import MockerFixture
+
+from hyacinth.util.cache import TTLCache
+
+MODULE = "hyacinth.util.cache"
+
+
+def test_put__cache_full__evicts_least_recently_used_entry() -> None:
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl_seconds=60)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+
+    cache.put("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+
+def test_get__entry_older_than_ttl__returns_none(mocker: MockerFixture) -> None:
+    monotonic_mock = mocker.patch(f"{MODULE}.time.monotonic", return_value=100)
+    cache: TTLCache[str, int] = TTLCache(maxsize=2, ttl_seconds=60)
+    cache.put("a", 1)
+
+    monotonic_mock.return_value = 159
+    assert cache.get("a") == 1
+
+    monotonic_mock.return_value = 160
+    assert cache.get("a") is None
+    assert len(cache) == 0
@@ -0,0 +1,21 @@
+import pytest
+
+from hyacinth.util.keyword_matcher import MIN_AUTOMATON_KEYWORDS, KeywordMatcher
+
+SOME_KEYWORDS = ["bike", "red bike", "bikes", "helmet", "ike"]
+
+
+@pytest.mark.parametrize("num_padding_keywords", [0, MIN_AUTOMATON_KEYWORDS])
+def test_match__overlapping_keywords__returns_every_keyword_in_text(
+    num_padding_keywords: int,
+) -> None:
+    padding_keywords = [f"unused{i}" for i in range(num_padding_keywords)]
+    matcher = KeywordMatcher(SOME_KEYWORDS + padding_keywords)
+
+    assert matcher.match("selling my red bikes, no helmet") == set(SOME_KEYWORDS)
+    assert matcher.match("a bike") == {"bike", "ike"}
+    assert matcher.match("nothing to see here") == set()
+
+
+def test_match__no_keywords__returns_empty_set() -> None:
+    assert KeywordMatcher([]).match("some text") == set()
@@ -0,0 +1,118 @@
+import asyncio
+
+from playwright.async_api import Error as PlaywrightError
+from playwright.async_api import Page
+from pytest_mock import MockerFixture
+
+from hyacinth.util.scraping import BrowserConnection, PagePool
+
+MODULE = "hyacinth.util.scraping"
+
+
+async def test_page_pool_map_ordered__out_of_order_completion__yields_results_in_input_order(
+    mocker: MockerFixture,
+) -> None:
+    mock_browser_context = mocker.AsyncMock()
+    in_flight = 0
+    max_in_flight = 0
+
+    async def fetch(page: Page, delay: float) -> float:
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+        await asyncio.sleep(delay)
+        in_flight -= 1
+        return delay
+
+    some_delays = [0.05, 0.01, 0.04, 0.02, 0.03, 0.0]
+    async with PagePool(mock_browser_context, size=3) as pool:
+        results = [result async for result in pool.map_ordered(some_delays, fetch)]
+
+    assert results == some_delays
+    assert max_in_flight == 3
+    assert mock_browser_context.new_page.await_count == 3
+
+
+async def test_page_pool_page__more_callers_than_size__opens_at_most_size_pages(
+    mocker: MockerFixture,
+) -> None:
+    mock_browser_context = mocker.AsyncMock()
+    borrowed = 0
+    max_borrowed = 0
+
+    async def borrow(pool: PagePool) -> None:
+        nonlocal borrowed, max_borrowed
+        async with pool.page():
+            borrowed += 1
+            max_borrowed = max(max_borrowed, borrowed)
+            await asyncio.sleep(0.01)
+            borrowed -= 1
+
+    async def new_page() -> Page:
+        # yield to the other callers while the page is being opened
+        await asyncio.sleep(0.01)
+        return mocker.AsyncMock()
+
+    mock_browser_context.new_page.side_effect = new_page
+    async with PagePool(mock_browser_context, size=2) as pool:
+        await asyncio.gather(*(borrow(pool) for _ in range(5)))
+
+    assert max_borrowed == 2
+    assert mock_browser_context.new_page.await_count == 2
+
+
+async def test_browser_connection_new_context__connection_dropped__reconnects(
+    mocker: MockerFixture,
+) -> None:
+    mock_async_playwright = mocker.patch(f"{MODULE}.async_playwright")
+    mock_playwright = mocker.AsyncMock()
+    mock_async_playwright.return_value.start = mocker.AsyncMock(return_value=mock_playwright)
+    mock_connect_over_cdp = mock_playwright.chromium.connect_over_cdp
+    first_browser, second_browser = mocker.AsyncMock(), mocker.AsyncMock()
+    first_browser.is_connected = mocker.Mock(return_value=True)
+    second_browser.is_connected = mocker.Mock(return_value=True)
+    mock_connect_over_cdp.side_effect = [first_browser, second_browser]
+
+    connection = BrowserConnection("ws://some-endpoint")
+    await connection.new_context()
+    await connection.new_context()
+    assert mock_connect_over_cdp.await_count == 1
+
+    first_browser.is_connected.return_value = False
+    await connection.new_context()
+
+    assert mock_connect_over_cdp.await_count == 2
+    first_browser.close.assert_awaited_once()
+    second_browser.new_context.assert_awaited_once()
+
+
+async def test_browser_connection_new_context__concurrent_errors__reconnects_once(
+    mocker: MockerFixture,
+) -> None:
+    num_stale_calls = 0
+
+    async def stale_new_context() -> None:
+        nonlocal num_stale_calls
+        num_stale_calls += 1
+        # the second caller only fails once the first has already reconnected
+        await asyncio.sleep(0.01 * (num_stale_calls - 1))
+        raise PlaywrightError("some error")
+
+    mock_async_playwright = mocker.patch(f"{MODULE}.async_playwright")
+    mock_playwright = mocker.AsyncMock()
+    mock_async_playwright.return_value.start = mocker.AsyncMock(return_value=mock_playwright)
+    mock_connect_over_cdp = mock_playwright.chromium.connect_over_cdp
+    first_browser, second_browser = mocker.AsyncMock(), mocker.AsyncMock()
+    first_browser.is_connected = mocker.Mock(return_value=True)
+    first_browser.new_context.side_effect = stale_new_context
+    second_browser.is_connected = mocker.Mock(return_value=True)
+    mock_connect_over_cdp.side_effect = [first_browser, second_browser]
+
+    connection = BrowserConnection("ws://some-endpoint")
+    await connection.connect()
+    await asyncio.gather(connection.new_context(), connection.new_context())
+
+    assert mock_connect_over_cdp.await_count == 2
+    first_browser.close.assert_awaited_once()
+    second_browser.close.assert_not_awaited()
+    assert second_browser.new_context.await_count == 2
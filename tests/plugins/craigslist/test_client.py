@@ -86,3 +86,29 @@ async def test__search__mocked_content__returns_all_listings_on_page_and_follows
         "listing for some-url-2",
         "listing for some-url-3",
     ]
+
+
+async def test__search__some_urls_already_seen__skips_seen_urls_and_stops_on_fully_seen_page(
+    mocker: MockerFixture,
+) -> None:
+    mocker.patch(f"{MODULE}.get_browser_context")
+    mocker.patch(f"{MODULE}._enrich_listing")
+    mock_parse_search_results = mocker.patch(
+        f"{MODULE}._parse_search_results",
+        side_effect=[(True, ["some-url-1", "some-url-2"]), (True, ["some-url-3"])],
+    )
+    mock_parse_result_details = mocker.patch(
+        f"{MODULE}._parse_result_details", side_effect=lambda url, _: f"listing for {url}"
+    )
+
+    listings = []
+    search = _search(
+        CraigslistSearchParams(site="boston", category="sss"),
+        seen_urls={"some-url-2", "some-url-3"},
+    )
+    async for listing in search:
+        listings.append(listing)
+
+    assert listings == ["listing for some-url-1"]
+    assert mock_parse_result_details.call_count == 1
+    assert mock_parse_search_results.call_count == 2
@@ -1,20 +1,30 @@
+import itertools
+import json
 from datetime import datetime
 
-from hyacinth.db.models import ChannelNotifierState, Filter, Listing, NotifierSearch, SearchSpec
+from hyacinth.db.models import (
+    ChannelNotifierState,
+    Filter,
+    Listing,
+    ListingContent,
+    NotifierSearch,
+    SearchSpec,
+)
 from hyacinth.enums import RuleType
 
 DEFAULT_SEARCH_SPEC_PLUGIN_PATH = "some_plugin_path"
-DEFAULT_SEARCH_SPEC_SEARCH_PARAMS_JSON = "{}"
+# search specs are unique, so search specs made without any search params each get different ones
+_search_spec_numbers = itertools.count()
 
 
 def make_search_spec(
     plugin_path: str = DEFAULT_SEARCH_SPEC_PLUGIN_PATH,
-    search_params_json: str = DEFAULT_SEARCH_SPEC_SEARCH_PARAMS_JSON,
+    search_params_json: str | None = None,
 ) -> SearchSpec:
-    return SearchSpec(
-        plugin_path=plugin_path,
-        search_params_json=search_params_json,
-    )
+    if search_params_json is None:
+        search_params_json = f'{{"sample_search": {next(_search_spec_numbers)}}}'
+
+    return SearchSpec.from_search_params(plugin_path, json.loads(search_params_json))
 
 
 DEFAULT_NOTIFIER_SEARCH_NAME = "some_search_name"
@@ -78,20 +88,30 @@ def make_channel_notifier_state(
     )
 
 
-DEFAULT_LISTING_LISTING_JSON = "{}"
 DEFAULT_LISTING_CREATION_TIME = datetime.now()
+# listing content is unique, so listings made without any JSON each get different content
+_listing_numbers = itertools.count()
 
 
 def make_listing(
     search_spec: SearchSpec | None = None,
-    listing_json: str = DEFAULT_LISTING_LISTING_JSON,
+    listing_json: str | None = None,
     creation_time: datetime = DEFAULT_LISTING_CREATION_TIME,
+    created_at: datetime | None = None,
+    url: str | None = None,
 ) -> Listing:
     if search_spec is None:
         search_spec = make_search_spec()
+    if listing_json is None:
+        listing_json = f'{{"sample_listing": {next(_listing_numbers)}}}'
 
-    return Listing(
-        listing_json=listing_json,
+    listing = Listing(
+        content=ListingContent.from_json(listing_json, url),
         search_spec=search_spec,
+        url=url,
         creation_time=creation_time,
     )
+    if created_at is not None:
+        listing.created_at = created_at
+
+    return listing